@@ -67,6 +67,7 @@ class DomainEnumerator:
         Find subdomains using certificate transparency logs (crt.sh)
         """
         subdomains = set()
+        domain_suffix = f'.{domain}'
         
         try:
             url = f"https://crt.sh/?q=%.{domain}&output=json"
@@ -90,7 +91,7 @@ class DomainEnumerator:
                                 subdomain = subdomain[2:]
                             
                             # Validate subdomain
-                            if subdomain.endswith(f'.{domain}') or subdomain == domain:
+                            if subdomain.endswith(domain_suffix) or subdomain == domain:
                                 subdomains.add(subdomain)
                 except:
                     # If JSON parsing fails, try HTML parsing
@@ -105,6 +106,7 @@ class DomainEnumerator:
         Fallback method to parse crt.sh HTML response
         """
         subdomains = set()
+        domain_suffix = f'.{domain}'
         
         try:
             url = f"https://crt.sh/?q=%.{domain}"
@@ -133,7 +135,7 @@ class DomainEnumerator:
                                     subdomain = subdomain[2:]
                                 
                                 # Validate subdomain
-                                if subdomain.endswith(f'.{domain}') or subdomain == domain:
+                                if subdomain.endswith(domain_suffix) or subdomain == domain:
                                     subdomains.add(subdomain)
         except Exception as e:
             st.warning(f"Error parsing crt.sh HTML for {domain}: {str(e)}")
@@ -145,6 +147,7 @@ class DomainEnumerator:
         Find subdomains using DNSDumpster
         """
         subdomains = set()
+        domain_suffix = f'.{domain}'
         
         try:
             url = f"https://dnsdumpster.com/"
@@ -178,7 +181,7 @@ class DomainEnumerator:
                             for td in table.find_all('td', {'class': 'col-md-4'}):
                                 for subdomain in td.text.split('\n'):
                                     subdomain = subdomain.strip().lower()
-                                    if subdomain.endswith(f'.{domain}'):
+                                    if subdomain.endswith(domain_suffix):
                                         subdomains.add(subdomain)
         except Exception as e:
             st.warning(f"Error querying DNSDumpster for {domain}: {str(e)}")
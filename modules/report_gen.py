@@ -1,12 +1,42 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import networkx as nx
 import datetime
 import os
-import ipaddress
 import streamlit as st
 
+# Indentation-preserving fragments of the HTML report tables
+_HTML_TABLE_HEAD = """
+            <h2>{title}</h2>
+            <table>
+                <thead>
+                    <tr>
+{header_cells}                    </tr>
+                </thead>
+                <tbody>
+            """
+_HTML_TABLE_ROW = """
+                    <tr>
+{cells}                    </tr>
+                """
+_HTML_TABLE_TAIL = """
+                </tbody>
+            </table>
+            """
+
+# Marker color per node type in the network map, in trace order
+_NETWORK_NODE_COLORS = {'org': 'red', 'domain': 'blue', 'subdomain': 'green', 'ip': 'orange'}
+
+def _html_table(title, headers, rows):
+    """Build one titled HTML report table, joining all rows in a single pass."""
+    parts = [_HTML_TABLE_HEAD.format(
+        title=title,
+        header_cells="".join(f"                        <th>{header}</th>\n" for header in headers)
+    )]
+    parts.extend(
+        _HTML_TABLE_ROW.format(cells="".join(f"                        <td>{cell}</td>\n" for cell in row))
+        for row in rows
+    )
+    parts.append(_HTML_TABLE_TAIL)
+    return "".join(parts)
+
 class ReportGenerator:
     def __init__(self):
         self.timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -100,151 +130,49 @@ class ReportGenerator:
         
         # Add ASN information
         if data.get('asns'):
-            html_content += """
-            <h2>Autonomous Systems (ASNs)</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>ASN</th>
-                        <th>Name</th>
-                        <th>Source</th>
-                    </tr>
-                </thead>
-                <tbody>
-            """
-            
-            for asn in data['asns']:
-                html_content += f"""
-                    <tr>
-                        <td>{asn['ASN']}</td>
-                        <td>{asn['Name']}</td>
-                        <td>{asn['Source']}</td>
-                    </tr>
-                """
-            
-            html_content += """
-                </tbody>
-            </table>
-            """
+            html_content += _html_table(
+                "Autonomous Systems (ASNs)",
+                ("ASN", "Name", "Source"),
+                ((asn['ASN'], asn['Name'], asn['Source']) for asn in data['asns'])
+            )
         
         # Add IP ranges information
         if data.get('ip_ranges'):
-            html_content += """
-            <h2>IP Ranges</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Prefix</th>
-                        <th>Version</th>
-                        <th>ASN</th>
-                        <th>Name</th>
-                        <th>Description</th>
-                    </tr>
-                </thead>
-                <tbody>
-            """
-            
-            for ip_range in data['ip_ranges']:
-                html_content += f"""
-                    <tr>
-                        <td>{ip_range['prefix']}</td>
-                        <td>IPv{ip_range['version']}</td>
-                        <td>{ip_range['asn']}</td>
-                        <td>{ip_range['name']}</td>
-                        <td>{ip_range['description']}</td>
-                    </tr>
-                """
-            
-            html_content += """
-                </tbody>
-            </table>
-            """
+            html_content += _html_table(
+                "IP Ranges",
+                ("Prefix", "Version", "ASN", "Name", "Description"),
+                ((ip_range['prefix'], f"IPv{ip_range['version']}", ip_range['asn'],
+                  ip_range['name'], ip_range['description'])
+                 for ip_range in data['ip_ranges'])
+            )
         
         # Add Domains information
         if data.get('domains'):
-            html_content += """
-            <h2>Base Domains</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Domain</th>
-                        <th>IP Addresses</th>
-                    </tr>
-                </thead>
-                <tbody>
-            """
-            
-            for domain in data['domains']:
-                ips = ', '.join(domain['ips']) if domain['ips'] else 'No IP found'
-                html_content += f"""
-                    <tr>
-                        <td>{domain['domain']}</td>
-                        <td>{ips}</td>
-                    </tr>
-                """
-            
-            html_content += """
-                </tbody>
-            </table>
-            """
+            html_content += _html_table(
+                "Base Domains",
+                ("Domain", "IP Addresses"),
+                ((domain['domain'], ', '.join(domain['ips']) if domain['ips'] else 'No IP found')
+                 for domain in data['domains'])
+            )
         
         # Add Subdomains information
         if data.get('subdomains'):
-            html_content += """
-            <h2>Subdomains</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Subdomain</th>
-                        <th>IP Addresses</th>
-                        <th>Cloud Provider</th>
-                    </tr>
-                </thead>
-                <tbody>
-            """
-            
-            for subdomain in data['subdomains']:
-                ips = ', '.join(subdomain['ips']) if subdomain['ips'] else 'No IP found'
-                cloud_provider = subdomain.get('cloud_provider', 'Unknown')
-                html_content += f"""
-                    <tr>
-                        <td>{subdomain['subdomain']}</td>
-                        <td>{ips}</td>
-                        <td>{cloud_provider}</td>
-                    </tr>
-                """
-            
-            html_content += """
-                </tbody>
-            </table>
-            """
+            html_content += _html_table(
+                "Subdomains",
+                ("Subdomain", "IP Addresses", "Cloud Provider"),
+                ((subdomain['subdomain'],
+                  ', '.join(subdomain['ips']) if subdomain['ips'] else 'No IP found',
+                  subdomain.get('cloud_provider', 'Unknown'))
+                 for subdomain in data['subdomains'])
+            )
         
         # Add Cloud Providers information
         if data.get('cloud_providers'):
-            html_content += """
-            <h2>Cloud Providers</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Provider</th>
-                        <th>Count</th>
-                    </tr>
-                </thead>
-                <tbody>
-            """
-            
-            for provider, count in data['cloud_providers'].items():
-                html_content += f"""
-                    <tr>
-                        <td>{provider}</td>
-                        <td>{count}</td>
-                    </tr>
-                """
-            
-            html_content += """
-                </tbody>
-            </table>
-            """
+            html_content += _html_table(
+                "Cloud Providers",
+                ("Provider", "Count"),
+                data['cloud_providers'].items()
+            )
         
         # Close HTML tags
         html_content += """
@@ -369,6 +297,11 @@ Generated on: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
         """
         Create visualizations for Streamlit display
         """
+        # Charting libraries are heavy to import; load them only when charts are requested
+        import plotly.express as px
+        import plotly.graph_objects as go
+        import networkx as nx
+
         visualizations = {}
         
         # 1. Cloud Providers Pie Chart
@@ -416,14 +349,17 @@ Generated on: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                         G.add_node(ip, type='ip')
                         G.add_edge(domain['domain'], ip)
                 
+                # Parent domain suffixes, built once instead of per subdomain/domain pair
+                domain_suffixes = [(f".{domain['domain']}", domain['domain']) for domain in data['domains']]
+                
                 # Add subdomain nodes and connect to parent domains
                 for subdomain in data['subdomains']:
                     G.add_node(subdomain['subdomain'], type='subdomain')
                     
                     # Connect to parent domain if found
-                    for domain in data['domains']:
-                        if subdomain['subdomain'].endswith(f".{domain['domain']}"):
-                            G.add_edge(domain['domain'], subdomain['subdomain'])
+                    for suffix, domain_name in domain_suffixes:
+                        if subdomain['subdomain'].endswith(suffix):
+                            G.add_edge(domain_name, subdomain['subdomain'])
                             break
                     
                     # Add IP nodes for subdomains
@@ -435,58 +371,56 @@ Generated on: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                 # Convert NetworkX graph to Plotly
                 pos = nx.spring_layout(G)
                 
-                # Node traces by type
-                node_traces = {}
-                for node_type in ['org', 'domain', 'subdomain', 'ip']:
-                    node_traces[node_type] = go.Scatter(
-                        x=[],
-                        y=[],
-                        text=[],
-                        mode='markers',
-                        hoverinfo='text',
-                        marker=dict(
-                            size=10,
-                            color={'org': 'red', 'domain': 'blue', 'subdomain': 'green', 'ip': 'orange'}[node_type],
-                        ),
-                        name=node_type.capitalize()
-                    )
-                
-                # Add nodes to traces
-                for node in G.nodes():
-                    node_type = G.nodes[node].get('type', 'ip')
+                # Collect coordinates in plain lists; appending to Plotly trace arrays
+                # one point at a time re-validates the whole array on every node
+                node_points = {node_type: ([], [], []) for node_type in _NETWORK_NODE_COLORS}
+                for node, node_type in G.nodes(data='type', default='ip'):
+                    xs, ys, texts = node_points[node_type]
                     x, y = pos[node]
-                    node_traces[node_type]['x'] += tuple([x])
-                    node_traces[node_type]['y'] += tuple([y])
-                    node_traces[node_type]['text'] += tuple([node])
-                
-                # Edge trace
-                edge_trace = go.Scatter(
-                    x=[],
-                    y=[],
-                    line=dict(width=0.5, color='#888'),
-                    hoverinfo='none',
-                    mode='lines'
-                )
+                    xs.append(x)
+                    ys.append(y)
+                    texts.append(node)
                 
-                # Add edges
-                for edge in G.edges():
-                    x0, y0 = pos[edge[0]]
-                    x1, y1 = pos[edge[1]]
-                    edge_trace['x'] += tuple([x0, x1, None])
-                    edge_trace['y'] += tuple([y0, y1, None])
+                edge_x, edge_y = [], []
+                for source, target in G.edges():
+                    x0, y0 = pos[source]
+                    x1, y1 = pos[target]
+                    edge_x += (x0, x1, None)
+                    edge_y += (y0, y1, None)
                 
-                # Create figure
-                fig = go.Figure(
-                    data=[edge_trace] + list(node_traces.values()),
-                    layout=go.Layout(
-                        title='Network Relationship Map',
-                        showlegend=True,
-                        hovermode='closest',
-                        margin=dict(b=20, l=5, r=5, t=40),
-                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
-                    )
-                )
+                # Create figure from a dict spec, validated once
+                edge_trace = {
+                    'type': 'scatter',
+                    'x': edge_x,
+                    'y': edge_y,
+                    'line': {'width': 0.5, 'color': '#888'},
+                    'hoverinfo': 'none',
+                    'mode': 'lines'
+                }
+                node_traces = [
+                    {
+                        'type': 'scatter',
+                        'x': xs,
+                        'y': ys,
+                        'text': texts,
+                        'mode': 'markers',
+                        'hoverinfo': 'text',
+                        'marker': {'size': 10, 'color': _NETWORK_NODE_COLORS[node_type]},
+                        'name': node_type.capitalize()
+                    }
+                    for node_type, (xs, ys, texts) in node_points.items()
+                ]
+                fig = go.Figure({
+                    'data': [edge_trace] + node_traces,
+                    'layout': {
+                        'title': 'Network Relationship Map',
+                        'showlegend': True,
+                        'hovermode': 'closest',
+                        'margin': {'b': 20, 'l': 5, 'r': 5, 't': 40},
+                        'xaxis': {'showgrid': False, 'zeroline': False, 'showticklabels': False},
+                        'yaxis': {'showgrid': False, 'zeroline': False, 'showticklabels': False}
+                    }
+                })
                 
                 visualizations['network_map'] = fig
             
@@ -13,6 +13,7 @@ import io
 import os
 import time
 import json
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Set, List, Dict, Any, Optional, Tuple
 import pandas as pd
@@ -39,6 +40,33 @@ ICONS = {
     "pending": "⏳", "running": "⌛", "completed": "✓"
 }
 
+# Section header HTML, built once at import instead of on every Streamlit rerun.
+# Pure-HTML blocks like these are rendered with st.html, which skips the markdown parser.
+_RESULTS_HEADER_TITLES = {
+    "asn": "Autonomous System Numbers (ASNs)",
+    "ip": "IP Ranges",
+    "domain": "Domains & Subdomains",
+    "cloud": "Cloud Services",
+    "summary": "Reconnaissance Summary",
+    "logs": "Process Logs",
+    "graph": "Network Relationship Graph",
+}
+_RESULTS_HEADER_HTML = {
+    key: f"""<div class="results-header"><h3>{ICONS[key]} {title}</h3></div>"""
+    for key, title in _RESULTS_HEADER_TITLES.items()
+}
+
+# Results tab labels, in display order
+_RESULT_TAB_LABELS = [
+    f"{ICONS['summary']} Summary",
+    f"{ICONS['asn']} ASNs",
+    f"{ICONS['ip']} IP Ranges",
+    f"{ICONS['domain']} Domains",
+    f"{ICONS['cloud']} Cloud",
+    f"{ICONS['graph']} Network Graph",
+    f"{ICONS['logs']} Process Logs",
+]
+
 # --- Custom CSS and Page Configuration ---
 def apply_custom_css():
     """Applies custom CSS for a professional UI look and feel"""
@@ -737,18 +765,19 @@ def get_subdomain_df(domains: Set[Domain]) -> pd.DataFrame:
                       for s in sorted(list(all_subs), key=lambda s: s.fqdn)]
     return pd.DataFrame(subdomain_list)
 
+# Display labels for statuses that get an indicator icon
+_STATUS_LABELS = {
+    "active": f"{ICONS['success']} Active",
+    "inactive": f"{ICONS['warning']} Inactive",
+}
+
 def _format_status(status: str) -> str:
     """Format the status with colored indicators."""
     if not status:
         return "Unknown"
     
     status = status.lower()
-    if status == "active":
-        return f"{ICONS['success']} Active"
-    elif status == "inactive":
-        return f"{ICONS['warning']} Inactive"
-    else:
-        return status.capitalize()
+    return _STATUS_LABELS.get(status) or status.capitalize()
 
 def _format_ip_list(ips: Optional[List[str]]) -> str:
     """Format a list of IPs with proper presentation."""
@@ -760,30 +789,30 @@ def _format_ip_list(ips: Optional[List[str]]) -> str:
     else:
         return f"{', '.join(sorted(ips)[:3])} (+{len(ips)-3} more)"
 
+# Provider display labels, checked in order against the lowercased provider name
+_PROVIDER_ICON_RULES = (
+    (("aws",), "🟠 AWS"),
+    (("azure", "microsoft"), "🔵 Azure"),
+    (("google", "gcp"), "🟢 GCP"),
+    (("cloudflare",), "🟡 Cloudflare"),
+    (("digital ocean",), "🔷 Digital Ocean"),
+    (("oracle",), "🔶 Oracle"),
+)
+
+def _get_provider_icon(provider: str) -> str:
+    """Get the display label with icon for a cloud provider."""
+    provider = provider.lower() if provider else ""
+    for keywords, label in _PROVIDER_ICON_RULES:
+        if any(keyword in provider for keyword in keywords):
+            return label
+    return f"☁️ {provider.title() if provider else 'Unknown'}"
+
 @st.cache_data(ttl=600)
 def get_cloud_service_df(services: Set[CloudService]) -> pd.DataFrame:
     """Prepare Cloud Service data for display with enhanced formatting."""
     logger.debug("Preparing Cloud Service DataFrame...")
     
-    # Helper function to get provider icon
-    def get_provider_icon(provider: str) -> str:
-        provider = provider.lower() if provider else ""
-        if "aws" in provider:
-            return "🟠 AWS"
-        elif "azure" in provider or "microsoft" in provider:
-            return "🔵 Azure"
-        elif "google" in provider or "gcp" in provider:
-            return "🟢 GCP"
-        elif "cloudflare" in provider:
-            return "🟡 Cloudflare"
-        elif "digital ocean" in provider:
-            return "🔷 Digital Ocean"
-        elif "oracle" in provider:
-            return "🔶 Oracle"
-        else:
-            return f"☁️ {provider.title() if provider else 'Unknown'}"
-    
-    cloud_list = [{"Provider": get_provider_icon(s.provider), 
+    cloud_list = [{"Provider": _get_provider_icon(s.provider), 
                    "Service Name": s.identifier, 
                    "Type": s.resource_type or "Unknown",
                    "Region": s.region or "-",
@@ -792,6 +821,19 @@ def get_cloud_service_df(services: Set[CloudService]) -> pd.DataFrame:
                   for s in sorted(list(services), key=lambda x: (x.provider, x.identifier))]
     return pd.DataFrame(cloud_list)
 
+@st.cache_data(ttl=600, show_spinner=False)
+def get_network_graph_html(result: ReconnaissanceResult) -> Optional[str]:
+    """Generate the network graph for a result and return its HTML, or None if generation failed.
+
+    Cached so reruns of the results page reuse the page instead of rebuilding the
+    pyvis network and rewriting its file each time.
+    """
+    graph_html_path = generate_network_graph(result)
+    if not graph_html_path:
+        return None
+    with open(graph_html_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
 # --- Enhanced Pagination Helper ---
 def display_paginated_dataframe(df: pd.DataFrame, page_size=DEFAULT_PAGINATION_SIZE, key_prefix="page"):
     """Enhanced pagination with better UI and controls."""
@@ -837,8 +879,9 @@ def display_paginated_dataframe(df: pd.DataFrame, page_size=DEFAULT_PAGINATION_S
     if search_term:
         mask = pd.Series(False, index=df.index)
         for col in df.columns:
-            # Convert column to string and check for case-insensitive contains
-            mask |= df[col].astype(str).str.contains(search_term, case=False, na=False)
+            # Convert column to string and check for case-insensitive plain substring match
+            # (regex=False: faster, and search text like "(" or "*" is not parsed as a pattern)
+            mask |= df[col].astype(str).str.contains(search_term, case=False, regex=False, na=False)
         filtered_df = df[mask]
         
         # Recalculate total pages based on filtered data
@@ -908,21 +951,24 @@ def display_paginated_dataframe(df: pd.DataFrame, page_size=DEFAULT_PAGINATION_S
 
 def display_empty_state(message: str, icon: str = "🔍"):
     """Display a well-styled empty state message."""
-    st.markdown(f"""
+    st.html(f"""
     <div class="empty-state">
         <div class="empty-state-icon">{icon}</div>
         <p>{message}</p>
     </div>
-    """, unsafe_allow_html=True)
+    """)
 
 # --- Enhanced Display Functions ---
 def display_asn_details(asns: Set[ASN]):
-    st.markdown(f"""<div class="results-header"><h3>{ICONS['asn']} Autonomous System Numbers (ASNs)</h3></div>""", unsafe_allow_html=True)
+    st.html(_RESULTS_HEADER_HTML["asn"])
     
     if asns:
         asn_df = get_asn_df(asns)
-        # ASNs are typically few enough to show all at once
-        st.dataframe(asn_df, use_container_width=True)
+        # ASNs are typically few enough to show all at once; paginate only large sets
+        if len(asn_df) > DEFAULT_PAGINATION_SIZE:
+            display_paginated_dataframe(asn_df, key_prefix="asn")
+        else:
+            st.dataframe(asn_df, use_container_width=True)
         
         # Add download button
         csv = asn_df.to_csv(index=False)
@@ -937,7 +983,7 @@ def display_asn_details(asns: Set[ASN]):
         display_empty_state("No ASNs found yet", ICONS["asn"])
 
 def display_ip_range_details(ip_ranges: Set[IPRange]):
-    st.markdown(f"""<div class="results-header"><h3>{ICONS['ip']} IP Ranges</h3></div>""", unsafe_allow_html=True)
+    st.html(_RESULTS_HEADER_HTML["ip"])
     
     if ip_ranges:
         ip_df = get_ip_range_df(ip_ranges)
@@ -974,7 +1020,7 @@ def display_ip_range_details(ip_ranges: Set[IPRange]):
         display_empty_state("No IP Ranges found yet", ICONS["ip"])
 
 def display_domain_details(domains: Set[Domain]):
-    st.markdown(f"""<div class="results-header"><h3>{ICONS['domain']} Domains & Subdomains</h3></div>""", unsafe_allow_html=True)
+    st.html(_RESULTS_HEADER_HTML["domain"])
     
     if domains:
         domain_df = get_domain_df(domains)
@@ -994,7 +1040,7 @@ def display_domain_details(domains: Set[Domain]):
         
         # Display domains table
         st.subheader("Primary Domains")
-        st.dataframe(domain_df, use_container_width=True)
+        display_paginated_dataframe(domain_df, page_size=50, key_prefix="domain")
         
         # Add download button for domains
         csv_domains = domain_df.to_csv(index=False)
@@ -1027,7 +1073,7 @@ def display_domain_details(domains: Set[Domain]):
         display_empty_state("No Domains or Subdomains found yet", ICONS["domain"])
 
 def display_cloud_services(services: Set[CloudService]):
-    st.markdown(f"""<div class="results-header"><h3>{ICONS['cloud']} Cloud Services</h3></div>""", unsafe_allow_html=True)
+    st.html(_RESULTS_HEADER_HTML["cloud"])
     
     if services:
         cloud_df = get_cloud_service_df(services)
@@ -1047,15 +1093,8 @@ def display_cloud_services(services: Set[CloudService]):
         # Display provider breakdown if multiple providers
         if len(providers) > 1:
             st.subheader("Cloud Provider Distribution")
-            provider_counts = {}
-            for service in services:
-                provider = service.provider or "Unknown"
-                provider_counts[provider] = provider_counts.get(provider, 0) + 1
-                
-            provider_df = pd.DataFrame({
-                "Provider": list(provider_counts.keys()),
-                "Services": list(provider_counts.values())
-            })
+            provider_counts = Counter(service.provider or "Unknown" for service in services)
+            provider_df = pd.DataFrame(provider_counts.most_common(), columns=["Provider", "Services"])
             
             col1, col2 = st.columns([1, 1])
             with col1:
@@ -1079,26 +1118,27 @@ def display_cloud_services(services: Set[CloudService]):
     else:
         display_empty_state("No Cloud Services found yet", ICONS["cloud"])
 
+# Summary metric card, filled from each metric's icon/value/label dict
+_SUMMARY_METRIC_CARD_TEMPLATE = """
+        <div style="flex: 1; min-width: 150px; background-color: white; border-radius: 8px; padding: 15px; box-shadow: 0 2px 5px rgba(0,0,0,0.05); text-align: center;">
+            <div style="font-size: 2rem; color: var(--primary); margin-bottom: 5px;">{icon} {value}</div>
+            <div style="font-size: 0.9rem; color: var(--text-light); text-transform: uppercase; letter-spacing: 0.05rem;">{label}</div>
+        </div>"""
+
 def display_summary(result: ReconnaissanceResult):
-    st.markdown(f"""<div class="results-header"><h3>{ICONS['summary']} Reconnaissance Summary</h3></div>""", unsafe_allow_html=True)
-    
-    # Target organization info
-    st.markdown(f"""
+    # Section header and target organization info, sent as one element
+    st.html(_RESULTS_HEADER_HTML["summary"] + f"""
     <div style="margin-bottom: 20px; padding: 15px; background-color: #f8f9fa; border-radius: 5px; border-left: 4px solid var(--primary);">
         <strong>Target:</strong> {result.target_organization}
         <br>
         <strong>Scan Time:</strong> {datetime.now().strftime(DATE_FORMAT)}
     </div>
-    """, unsafe_allow_html=True)
+    """)
     
-    # Use cached DFs for counts where appropriate
-    subdomain_count = len(get_subdomain_df(result.domains)) if result.domains else 0
+    # Count unique subdomains directly; building (and hashing the input of) the display DataFrame just for len() is wasted work
+    subdomain_count = len(result.get_all_subdomains())
     
     # Create a more visually appealing metrics display
-    st.markdown("""
-    <div style="display: flex; justify-content: space-between; flex-wrap: wrap; gap: 10px; margin-bottom: 20px;">
-    """, unsafe_allow_html=True)
-    
     metrics = [
         {"icon": ICONS["asn"], "label": "ASNs", "value": len(result.asns)},
         {"icon": ICONS["ip"], "label": "IP Ranges", "value": len(result.ip_ranges)},
@@ -1107,15 +1147,13 @@ def display_summary(result: ReconnaissanceResult):
         {"icon": ICONS["cloud"], "label": "Cloud Services", "value": len(result.cloud_services)}
     ]
     
-    for metric in metrics:
-        st.markdown(f"""
-        <div style="flex: 1; min-width: 150px; background-color: white; border-radius: 8px; padding: 15px; box-shadow: 0 2px 5px rgba(0,0,0,0.05); text-align: center;">
-            <div style="font-size: 2rem; color: var(--primary); margin-bottom: 5px;">{metric["icon"]} {metric["value"]}</div>
-            <div style="font-size: 0.9rem; color: var(--text-light); text-transform: uppercase; letter-spacing: 0.05rem;">{metric["label"]}</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
+    # Render all cards inside the flex container in one element; separate markdown
+    # calls each become their own element, so the container would not wrap the cards
+    metric_cards = "".join(_SUMMARY_METRIC_CARD_TEMPLATE.format_map(metric) for metric in metrics)
+    st.markdown(f"""
+    <div style="display: flex; justify-content: space-between; flex-wrap: wrap; gap: 10px; margin-bottom: 20px;">{metric_cards}
+    </div>
+    """, unsafe_allow_html=True)
     
     # Display Warnings
     if result.warnings:
@@ -1126,8 +1164,8 @@ def display_summary(result: ReconnaissanceResult):
         """, unsafe_allow_html=True)
         
         with st.expander("View Warnings"):
-            for warning in result.warnings:
-                st.markdown(f"- {warning}")
+            # One markdown list instead of one element per warning
+            st.markdown("\n".join(f"- {warning}" for warning in result.warnings))
     else:
         st.markdown(f"""
         <div class="status-card status-success">
@@ -1151,8 +1189,17 @@ def display_summary(result: ReconnaissanceResult):
                 key="download_json"
             )
 
+# Log level name and the marker searched for in each line (surrounding spaces avoid
+# matching the level name inside a message)
+_LOG_LEVEL_MARKERS = (("INFO", " INFO "), ("WARNING", " WARNING "), ("ERROR", " ERROR "), ("DEBUG", " DEBUG "))
+# Choices offered by the log filter selectbox
+_LOG_FILTER_OPTIONS = ("All Logs", "Info Only", "Warnings & Errors Only", "Debug Only")
+# Markdown text colors for log levels whose non-zero counts deserve attention
+_LOG_STAT_COLORS = {"WARNING": "orange", "ERROR": "red"}
+
+@st.experimental_fragment  # Changing the log filter reruns only this section, not the whole page
 def display_process_logs(log_stream: io.StringIO):
-    st.markdown(f"""<div class="results-header"><h3>{ICONS['logs']} Process Logs</h3></div>""", unsafe_allow_html=True)
+    st.html(_RESULTS_HEADER_HTML["logs"])
     
     log_content = log_stream.getvalue()
     
@@ -1161,12 +1208,13 @@ def display_process_logs(log_stream: io.StringIO):
         return
     
     # Filter options
-    filter_options = ["All Logs", "Info Only", "Warnings & Errors Only", "Debug Only"]
-    selected_filter = st.selectbox("Filter Logs:", filter_options)
+    selected_filter = st.selectbox("Filter Logs:", _LOG_FILTER_OPTIONS)
+    
+    log_lines = log_content.split('\n')
     
     # Process logs based on filter
     filtered_logs = []
-    for line in log_content.split('\n'):
+    for line in log_lines:
         if selected_filter == "All Logs":
             filtered_logs.append(line)
         elif selected_filter == "Info Only" and "INFO" in line:
@@ -1201,21 +1249,18 @@ def display_process_logs(log_stream: io.StringIO):
         )
         
         # Log statistics
-        st.markdown("**Log Statistics:**")
-        log_stats = {
-            "Total Lines": log_content.count('\n') + (1 if log_content else 0),
-            "INFO": sum(1 for line in log_content.split('\n') if " INFO " in line), # Use spaces to avoid matching level name in message
-            "WARNING": sum(1 for line in log_content.split('\n') if " WARNING " in line),
-            "ERROR": sum(1 for line in log_content.split('\n') if " ERROR " in line),
-            "DEBUG": sum(1 for line in log_content.split('\n') if " DEBUG " in line)
-        }
+        log_stats = {"Total Lines": len(log_lines), "INFO": 0, "WARNING": 0, "ERROR": 0, "DEBUG": 0}
+        # Count all levels in a single pass over the lines
+        for line in log_lines:
+            for level, marker in _LOG_LEVEL_MARKERS:
+                if marker in line:
+                    log_stats[level] += 1
+        # Emit the whole panel as one element, highlighting non-zero warning/error counts
+        stat_lines = ["**Log Statistics:**", ""]
         for key, value in log_stats.items():
-            if key == "WARNING" and value > 0:
-                st.warning(f"{key}: {value}")
-            elif key == "ERROR" and value > 0:
-                st.error(f"{key}: {value}")
-            else:
-                st.info(f"{key}: {value}")
+            color = _LOG_STAT_COLORS.get(key) if value > 0 else None
+            stat_lines.append(f"- :{color}[{key}: **{value}**]" if color else f"- {key}: **{value}**")
+        st.markdown("\n".join(stat_lines))
 
 # --- Main App ---
 def main():
@@ -1666,25 +1711,7 @@ def main():
         """, unsafe_allow_html=True)
         
         # Create tabs with enhanced styling
-        tab_icons = {
-            "summary": f"{ICONS['summary']} Summary",
-            "asns": f"{ICONS['asn']} ASNs",
-            "ips": f"{ICONS['ip']} IP Ranges",
-            "domains": f"{ICONS['domain']} Domains",
-            "cloud": f"{ICONS['cloud']} Cloud",
-            "graph": f"{ICONS['graph']} Network Graph",
-            "logs": f"{ICONS['logs']} Process Logs"
-        }
-        
-        tab_summary, tab_asns, tab_ips, tab_domains, tab_cloud, tab_graph, tab_logs = st.tabs([
-            tab_icons["summary"], 
-            tab_icons["asns"],
-            tab_icons["ips"],
-            tab_icons["domains"],
-            tab_icons["cloud"],
-            tab_icons["graph"],
-            tab_icons["logs"]
-        ])
+        tab_summary, tab_asns, tab_ips, tab_domains, tab_cloud, tab_graph, tab_logs = st.tabs(_RESULT_TAB_LABELS)
 
         with tab_summary:
             display_summary(result_data)
@@ -1702,31 +1729,37 @@ def main():
             display_cloud_services(result_data.cloud_services)
             
         with tab_graph:
-            st.markdown(f"""<div class="results-header"><h3>{ICONS['graph']} Network Relationship Graph</h3></div>""", unsafe_allow_html=True)
+            st.html(_RESULTS_HEADER_HTML["graph"])
             
-            graph_html_path = generate_network_graph(result_data)
-            if graph_html_path:
+            # Nothing but the target node to draw: skip generating and embedding the pyvis page
+            if not (result_data.asns or result_data.ip_ranges or result_data.domains or result_data.cloud_services):
+                display_empty_state("No assets discovered to graph", ICONS["graph"])
+            elif not (st.session_state.get("show_network_graph")
+                      or st.button(f"{ICONS['graph']} Generate Network Graph", key="show_network_graph_btn")):
+                # Tab bodies all run on every rerun, so build the graph only once the user asks for it
+                st.info(f"{ICONS['info']} The network graph is generated on demand for the current results.")
+            else:
+                st.session_state.show_network_graph = True
                 try:
-                    with open(graph_html_path, 'r', encoding='utf-8') as f:
-                        html_content = f.read()
-                    st.components.v1.html(html_content, height=800, scrolling=True)
+                    html_content = get_network_graph_html(result_data)
+                    if html_content:
+                        st.components.v1.html(html_content, height=800, scrolling=True)
                     
-                    # Add download button for the graph in a cleaner format
-                    with open(graph_html_path, "rb") as fp:
+                        # Add download button for the graph in a cleaner format
                         st.download_button(
                             label="📥 Download Network Graph (HTML)",
-                            data=fp,
+                            data=html_content,
                             file_name=f"network_graph_{target_org.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html",
                             mime="text/html",
                             key="download_graph"
                         )
-                except FileNotFoundError:
-                    st.error(f"Could not find generated graph file: {graph_html_path}")
+                    else:
+                        display_empty_state("Network graph generation failed", ICONS["graph"])
+                except FileNotFoundError as e:
+                    st.error(f"Could not find generated graph file: {e.filename}")
                 except Exception as e:
                     logger.error(f"Error displaying graph HTML: {e}")
                     st.error("Could not display the generated network graph.")
-            else:
-                display_empty_state("Network graph generation failed", ICONS["graph"])
                 
         with tab_logs:
             display_process_logs(st.session_state.log_stream)
@@ -1810,17 +1843,19 @@ def main():
                     # Create a grid layout for the scan cards
                     cols_per_row = 3  # Number of cards per row
                     scan_rows = [filtered_scans[i:i + cols_per_row] for i in range(0, len(filtered_scans), cols_per_row)]
+                    # Reference time for "days ago", taken once for all cards
+                    now = datetime.now()
                     
                     for row in scan_rows:
                         cols = st.columns(cols_per_row)
                         for idx, scan in enumerate(row):
                             with cols[idx]:
-                                # Format dates
-                                scan_date = scan['scan_timestamp'].strftime("%d %b %Y")
-                                scan_time = scan['scan_timestamp'].strftime("%H:%M")
+                                # Format date and time in one pass
+                                scan_timestamp = scan['scan_timestamp']
+                                scan_datetime = scan_timestamp.strftime("%d %b %Y, %H:%M")
                                 
                                 # Calculate days ago
-                                days_ago = (datetime.now() - scan['scan_timestamp']).days
+                                days_ago = (now - scan_timestamp).days
                                 time_ago = f"{days_ago} days ago" if days_ago > 0 else "Today"
                                 
                                 # Determine icon based on target (simple example)
@@ -1841,7 +1876,7 @@ def main():
                                                 {target_name}
                                             </div>
                                             <div style="font-size: 0.85em; color: #666;">
-                                                {scan_date}, {scan_time} <span style="opacity: 0.7;">({time_ago})</span>
+                                                {scan_datetime} <span style="opacity: 0.7;">({time_ago})</span>
                                             </div>
                                         </div>
                                     </div>
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Optional, Set
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 import json
 
@@ -101,6 +101,29 @@ class ReconnaissanceResult:
     # Subdomains are stored within Domain objects
     cloud_services: Set[CloudService] = field(default_factory=set)
     warnings: List[str] = field(default_factory=list) # Add warnings list
+    # Name -> Domain index for O(1) lookups in add_domain/add_subdomain (rebuilt if domains is modified directly)
+    _domain_index: Dict[str, Domain] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _indexed_domains: Optional[Set[Domain]] = field(default=None, init=False, repr=False, compare=False)
+    # Set mirror of warnings for O(1) duplicate checks in add_warning (rebuilt if warnings is modified directly)
+    _warning_index: Set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+    _indexed_warnings: Optional[List[str]] = field(default=None, init=False, repr=False, compare=False)
+
+    def _find_domain(self, name: str) -> Optional[Domain]:
+        """Returns the domain with the given name, or None."""
+        domain = self._domain_index.get(name)
+        if (self._indexed_domains is not self.domains
+                or len(self._domain_index) != len(self.domains)
+                # Same-size changes: a hit that was removed, or a miss that was added directly
+                or (domain not in self.domains if domain is not None else Domain(name=name) in self.domains)):
+            # domains was replaced or modified outside add_domain/add_subdomain
+            self._domain_index = {d.name: d for d in self.domains}
+            self._indexed_domains = self.domains
+            domain = self._domain_index.get(name)
+        return domain
+
+    def _index_new_domain(self, domain: Domain):
+        self.domains.add(domain)
+        self._domain_index[domain.name] = domain
 
     def add_asn(self, asn: ASN):
         self.asns.add(asn)
@@ -110,19 +133,19 @@ class ReconnaissanceResult:
 
     def add_domain(self, domain: Domain):
         # Check if domain already exists and merge subdomains if necessary
-        existing_domain = next((d for d in self.domains if d.name == domain.name), None)
+        existing_domain = self._find_domain(domain.name)
         if existing_domain:
             existing_domain.subdomains.update(domain.subdomains)
             # Optionally update registrar/IPs if new info is better? Needs logic.
         else:
-            self.domains.add(domain)
+            self._index_new_domain(domain)
 
     def add_subdomain(self, parent_domain_name: str, subdomain: Subdomain):
         # Find the parent domain or create it if it doesn't exist
-        parent_domain = next((d for d in self.domains if d.name == parent_domain_name), None)
+        parent_domain = self._find_domain(parent_domain_name)
         if not parent_domain:
             parent_domain = Domain(name=parent_domain_name)
-            self.domains.add(parent_domain)
+            self._index_new_domain(parent_domain)
         parent_domain.subdomains.add(subdomain)
 
     def add_cloud_service(self, service: CloudService):
@@ -130,9 +153,14 @@ class ReconnaissanceResult:
 
     def add_warning(self, message: str):
         """Adds a warning message to the result."""
+        if self._indexed_warnings is not self.warnings or len(self._warning_index) != len(self.warnings):
+            # warnings was replaced or modified outside add_warning
+            self._warning_index = set(self.warnings)
+            self._indexed_warnings = self.warnings
         # Avoid duplicate warnings
-        if message not in self.warnings:
+        if message not in self._warning_index:
              self.warnings.append(message)
+             self._warning_index.add(message)
 
     def get_all_subdomains(self) -> Set[Subdomain]:
         all_subs = set()
@@ -2,9 +2,9 @@
 
 import logging
 import re
-from typing import Set, Optional, Callable
+import socket
+from typing import Dict, Iterable, Set, Optional, Callable
 from urllib.parse import quote_plus
-import ipaddress
 
 from bs4 import BeautifulSoup
 from ipwhois import IPWhois
@@ -23,6 +23,14 @@ BGP_HE_NET_URL = "https://bgp.he.net"
 
 DEFAULT_MAX_WHOIS_WORKERS = 10
 
+# Team Cymru bulk IP->ASN whois: many IPs answered over a single TCP connection
+CYMRU_WHOIS_SERVER = "whois.cymru.com"
+CYMRU_WHOIS_PORT = 43
+CYMRU_WHOIS_TIMEOUT = 30
+CYMRU_BULK_BATCH_SIZE = 500 # IPs per bulk query, so a failed query only loses one batch
+
+_ASN_TEXT_RE = re.compile(r"AS(\d+)")
+
 def _parse_bgp_he_net_search(html_content: str, result: ReconnaissanceResult) -> Set[ASN]:
     """Parses the BGP.HE.NET search results page for ASNs."""
     asns: Set[ASN] = set()
@@ -40,7 +48,7 @@ def _parse_bgp_he_net_search(html_content: str, result: ReconnaissanceResult) ->
             asn_div = soup.find('div', {'id': 'asn'})
             if asn_div:
                 asn_text = asn_div.find('h1').get_text(strip=True) if asn_div.find('h1') else ""
-                asn_match = re.match(r"AS(\d+)", asn_text)
+                asn_match = _ASN_TEXT_RE.match(asn_text)
                 if asn_match:
                     asn_number = int(asn_match.group(1))
                     # Extract description - this is highly dependent on page structure
@@ -64,7 +72,7 @@ def _parse_bgp_he_net_search(html_content: str, result: ReconnaissanceResult) ->
                 if first_cell_link and first_cell_link.get('href', '').startswith('/ASN/'):
                     try:
                         asn_text = first_cell_link.get_text(strip=True)
-                        asn_match = re.match(r"AS(\d+)", asn_text)
+                        asn_match = _ASN_TEXT_RE.match(asn_text)
                         if asn_match:
                             asn_number = int(asn_match.group(1))
                             # Try to get description from the next cell if available
@@ -126,11 +134,13 @@ def find_asns_for_organization(
     base_domains: Optional[Set[str]], 
     result: ReconnaissanceResult,
     max_workers: int = DEFAULT_MAX_WHOIS_WORKERS,
-    progress_callback: Optional[Callable[[float, str], None]] = None
+    progress_callback: Optional[Callable[[float, str], None]] = None,
+    known_ips: Optional[Set[str]] = None
 ):
     """Find ASNs associated with an organization or its domains and add them to the result object.
 
-    Uses BGP.HE.NET and IP->ASN lookup via RDAP/WHOIS.
+    Uses BGP.HE.NET and IP->ASN lookup via Team Cymru bulk whois, with per-IP
+    RDAP/WHOIS as a fallback for IPs the bulk query did not answer.
 
     Args:
         org_name: The name of the target organization.
@@ -138,6 +148,7 @@ def find_asns_for_organization(
         result: The ReconnaissanceResult object to add findings and warnings to.
         max_workers: Maximum number of workers for concurrent IPWhois lookups.
         progress_callback: Optional callback function for progress updates.
+        known_ips: Optional set of IPs already looked up in a previous scan (skipped for IP->ASN lookup).
     """
     discovered_asns: Set[ASN] = set()
     logger.info(f"Starting ASN discovery for organization: {org_name}")
@@ -157,7 +168,8 @@ def find_asns_for_organization(
     # --- Query BGP.HE.NET by Domain Name --- 
     if base_domains:
          logger.info(f"Adding base domains to BGP.HE.NET queries: {base_domains}")
-         bgp_queries.update(base_domains)
+         # Normalize in one pass so case/whitespace variants of a domain cost a single rate-limited query
+         bgp_queries.update(domain.strip().lower() for domain in base_domains if domain and domain.strip())
          # Removed loop and direct calls:
          # for domain in base_domains:
          #     asns_from_domain = _query_bgp_he_net(domain, result)
@@ -206,17 +218,37 @@ def find_asns_for_organization(
                   if subdomain.resolved_ips:
                        all_ips_to_check.update(subdomain.resolved_ips)
     
+    if known_ips and all_ips_to_check:
+         skipped_count = len(all_ips_to_check)
+         all_ips_to_check.difference_update(known_ips)
+         skipped_count -= len(all_ips_to_check)
+         logger.info(f"Skipping ASN lookup for {skipped_count} IPs already checked in a previous scan.")
+    
     if not all_ips_to_check:
          logger.warning("No resolved IPs found from domains/subdomains to perform ASN lookup.")
          if progress_callback:
              progress_callback(90.0, "Skipped IP->ASN lookup (no IPs)") # Update progress if skipping
     else:
-        logger.info(f"Found {len(all_ips_to_check)} unique public IPs to check for ASN origin using up to {max_workers} workers.")
+        logger.info(f"Found {len(all_ips_to_check)} unique public IPs to check for ASN origin.")
         found_asns_from_ips = set() # Collect ASN objects found from IPs
 
+        # Resolve as many IPs as possible with bulk queries; only the rest go through per-IP WHOIS
+        if progress_callback:
+            progress_callback(20.0, f"Bulk ASN lookup for {len(all_ips_to_check)} IPs via Team Cymru...")
+        bulk_results = _bulk_lookup_asns_cymru(all_ips_to_check, result)
+        logger.info(f"Team Cymru bulk lookup answered {len(bulk_results)}/{len(all_ips_to_check)} IPs.")
+
+        for ip, asn_info in bulk_results.items():
+            if asn_info not in discovered_asns and asn_info not in found_asns_from_ips:
+                logger.info(f"Found ASN {asn_info.number} ({asn_info.description or 'No description'}) for IP {ip} via Team Cymru")
+                found_asns_from_ips.add(asn_info)
+        fallback_ips = all_ips_to_check.difference(bulk_results)
+
         with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="IPWhoisLookup") as executor:
             # Map future to the IP address it's processing
-            future_to_ip = {executor.submit(_lookup_asn_for_ip, ip): ip for ip in all_ips_to_check}
+            future_to_ip = {executor.submit(_lookup_asn_for_ip, ip): ip for ip in fallback_ips}
+            if future_to_ip:
+                logger.info(f"Looking up {len(future_to_ip)} remaining IPs via per-IP WHOIS using up to {max_workers} workers.")
             
             processed_count = 0
             total_count = len(future_to_ip)
@@ -263,7 +295,71 @@ def find_asns_for_organization(
     if progress_callback:
         progress_callback(100.0, f"ASN Discovery Complete ({len(result.asns)} found)")
 
-# --- Helper function for parallel IP lookup --- 
+# --- Helpers for IP -> ASN lookup --- 
+def _parse_cymru_bulk_response(response_text: str) -> Dict[str, ASN]:
+    """Parses Team Cymru verbose bulk whois output into an IP -> ASN mapping.
+
+    Data lines look like:
+        15169   | 8.8.8.8          | 8.8.8.0/24          | US | arin     | 2023-12-28 | GOOGLE, US
+    The banner, the column header and unrouted IPs (AS "NA") are skipped.
+    """
+    asns_by_ip: Dict[str, ASN] = {}
+    for line in response_text.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) < 7 or not fields[0].isdigit():
+            continue
+        asn_number, ip_addr, country, as_name = int(fields[0]), fields[1], fields[3], fields[6]
+        asns_by_ip[ip_addr] = ASN(
+            number=asn_number,
+            name=as_name or None,
+            description=as_name or None,
+            country=country or None,
+            data_source=f"TeamCymru({ip_addr})"
+        )
+    return asns_by_ip
+
+@with_api_backoff
+def _query_cymru_bulk(ip_addrs: Iterable[str], timeout: float = CYMRU_WHOIS_TIMEOUT) -> Dict[str, ASN]:
+    """Looks up the origin ASN of a batch of IPs with one Team Cymru bulk whois query, with rate limiting.
+
+    Raises:
+        OSError: If the connection to the whois server fails or times out (timeouts are retried first).
+    """
+    ip_addrs = list(ip_addrs)
+    rate_limiter = get_rate_limiter()
+
+    with rate_limiter.acquire("team_cymru", f"bulk_{len(ip_addrs)}_ips"):
+        query = "begin\nverbose\n" + "\n".join(ip_addrs) + "\nend\n"
+        chunks = []
+        with socket.create_connection((CYMRU_WHOIS_SERVER, CYMRU_WHOIS_PORT), timeout=timeout) as sock:
+            sock.sendall(query.encode("ascii"))
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                chunks.append(data)
+    return _parse_cymru_bulk_response(b"".join(chunks).decode("utf-8", errors="replace"))
+
+def _bulk_lookup_asns_cymru(ip_addrs: Iterable[str], result: ReconnaissanceResult) -> Dict[str, ASN]:
+    """Looks up the origin ASN of many IPs via Team Cymru bulk whois, CYMRU_BULK_BATCH_SIZE IPs per query.
+
+    If a batch still fails after retries, a warning is recorded and the remaining batches
+    are not sent; IPs missing from the returned mapping fall back to per-IP WHOIS.
+    """
+    ip_list = sorted(ip_addrs)
+    asns_by_ip: Dict[str, ASN] = {}
+    for start in range(0, len(ip_list), CYMRU_BULK_BATCH_SIZE):
+        batch = ip_list[start:start + CYMRU_BULK_BATCH_SIZE]
+        try:
+            asns_by_ip.update(_query_cymru_bulk(batch))
+        except (OSError, UnicodeError) as e:
+            warning_msg = (f"Team Cymru bulk lookup failed, falling back to per-IP WHOIS for "
+                           f"{len(ip_list) - start} IPs: {e}")
+            logger.warning(warning_msg)
+            result.add_warning(f"ASN Discovery (Team Cymru): {warning_msg}")
+            break
+    return asns_by_ip
+
 def _lookup_asn_for_ip(ip_addr: str) -> Optional[ASN]:
      """Performs IPWhois lookup for a single IP and returns an ASN object or None."""
      try:
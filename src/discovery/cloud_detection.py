@@ -1,7 +1,7 @@
 import logging
 import re # Make sure re is imported
-from typing import Set, Dict, Optional, Callable # Add Dict, Optional, Callable
-import ipaddress
+from typing import Set, Dict, List, Optional, Callable, Iterator, Tuple # Add Dict, Optional, Callable
+from bisect import bisect_right
 
 # Use netaddr instead of iptree
 try:
@@ -11,7 +11,7 @@ except ImportError:
     NETADDR_AVAILABLE = False
     # logger is not defined yet here, log in functions or main entry
 
-from src.core.models import IPRange, Domain, CloudService, ReconnaissanceResult, Subdomain # Add ReconnaissanceResult and Subdomain
+from src.core.models import IPRange, Domain, CloudService, ReconnaissanceResult # Add ReconnaissanceResult
 # ... other imports ...
 
 logger = logging.getLogger(__name__)
@@ -107,12 +107,43 @@ CLOUD_DOMAIN_PATTERNS = {
     # Add more providers and patterns as needed
 }
 
+# Precompiled (provider, pattern, regex) triples, in CLOUD_DOMAIN_PATTERNS order
+_COMPILED_CLOUD_DOMAIN_PATTERNS = [
+    (provider, pattern, re.compile(pattern, re.IGNORECASE))
+    for provider, patterns in CLOUD_DOMAIN_PATTERNS.items()
+    for pattern in patterns
+]
+# Single alternation of all patterns, used to reject non-cloud names with one regex scan
+_ANY_CLOUD_DOMAIN_RE = re.compile(
+    "|".join(f"(?:{pattern})" for _, pattern, _ in _COMPILED_CLOUD_DOMAIN_PATTERNS),
+    re.IGNORECASE
+)
+
 # --- Cloud Data Initialization (using netaddr) ---
 _CLOUD_IP_SETS_BY_PROVIDER: Dict[str, IPSet] = {}
+# Per provider and IP version: sorted, merged (starts, ends) integer intervals of the IPSet
+_CLOUD_IP_INTERVALS_BY_PROVIDER: Dict[str, Dict[int, Tuple[List[int], List[int]]]] = {}
+
+def _build_intervals(ip_set: "IPSet") -> Dict[int, Tuple[List[int], List[int]]]:
+    """Flattens an IPSet into sorted integer (start, end) lists keyed by IP version."""
+    intervals: Dict[int, Tuple[List[int], List[int]]] = {}
+    # iter_ipranges() yields merged, non-overlapping ranges in ascending order
+    for ip_range in ip_set.iter_ipranges():
+        starts, ends = intervals.setdefault(ip_range.version, ([], []))
+        starts.append(ip_range.first)
+        ends.append(ip_range.last)
+    return intervals
+
+def _intervals_overlap(intervals: Tuple[List[int], List[int]], first: int, last: int) -> bool:
+    """Returns True if [first, last] overlaps any of the sorted, disjoint intervals."""
+    starts, ends = intervals
+    # Last interval starting at or before `last`; it is the only candidate that can overlap
+    idx = bisect_right(starts, last) - 1
+    return idx >= 0 and ends[idx] >= first
 
 def _initialize_cloud_ip_sets():
     """Builds IPSet objects for each cloud provider from KNOWN_CLOUD_RANGES."""
-    global _CLOUD_IP_SETS_BY_PROVIDER
+    global _CLOUD_IP_SETS_BY_PROVIDER, _CLOUD_IP_INTERVALS_BY_PROVIDER
     if not NETADDR_AVAILABLE:
         logger.warning("netaddr library not found. Cannot perform efficient cloud detection from IP ranges.")
         return
@@ -144,6 +175,9 @@ def _initialize_cloud_ip_sets():
             logger.exception(f"Unexpected error initializing IPSet for provider '{provider}': {e}")
             
     _CLOUD_IP_SETS_BY_PROVIDER = temp_sets
+    _CLOUD_IP_INTERVALS_BY_PROVIDER = {
+        provider: _build_intervals(ip_set) for provider, ip_set in temp_sets.items()
+    }
     logger.info(f"Initialized Cloud IP Sets for {len(_CLOUD_IP_SETS_BY_PROVIDER)} providers.")
 
 # Initialize on module load
@@ -151,6 +185,59 @@ _initialize_cloud_ip_sets()
 
 # --- Cloud Detection Functions ---
 
+def cloud_ip_detection_ready() -> bool:
+    """Returns True if IP range cloud detection can run (netaddr present and IP sets built)."""
+    return NETADDR_AVAILABLE and bool(_CLOUD_IP_SETS_BY_PROVIDER)
+
+def classify_ip_range(ipr: IPRange, result: ReconnaissanceResult) -> Optional[str]:
+    """Checks a single IP range against the known cloud provider sets.
+
+    Adds a CloudService to the result on the first provider match. Can be called
+    inline while IP ranges are being produced, avoiding a second pass over them.
+
+    Returns:
+        The matched provider name, or None if no provider matched (or on error).
+    """
+    if not cloud_ip_detection_ready():
+        return None
+
+    try:
+        # Create an IPNetwork object for the discovered range
+        ip_network_to_check = IPNetwork(ipr.cidr)
+    except (AddrFormatError, ValueError, TypeError) as e:
+        warning_msg = f"Skipping invalid discovered CIDR for cloud check: {ipr.cidr}. Error: {e}"
+        logger.warning(warning_msg)
+        result.add_warning(f"Cloud Detection: {warning_msg}")
+        return None
+    except Exception as e:
+         warning_msg = f"Unexpected error parsing IP range {ipr.cidr} for cloud check: {e}"
+         logger.exception(warning_msg) # Log traceback
+         result.add_warning(f"Cloud Detection: {warning_msg}")
+         return None
+
+    try:
+        # Check for overlap against each provider's precomputed integer intervals
+        first, last = ip_network_to_check.first, ip_network_to_check.last
+        version = ip_network_to_check.version
+        for provider, intervals_by_version in _CLOUD_IP_INTERVALS_BY_PROVIDER.items():
+            intervals = intervals_by_version.get(version)
+            if intervals and _intervals_overlap(intervals, first, last):
+                logger.debug(f"Found cloud match for {ipr.cidr} via netaddr IPSet: {provider}")
+                result.add_cloud_service(CloudService(
+                    provider=provider,
+                    identifier=ipr.cidr,
+                    resource_type="IP Range",
+                    data_source="IPRangeMatch (netaddr)"
+                ))
+                return provider # Stop checking providers for this IP range once a match is found
+    except Exception as e:
+        # Catch errors during the intersection check itself
+        warning_msg = f"Error checking intersection for IP range {ipr.cidr} against cloud sets: {e}"
+        logger.exception(warning_msg)
+        result.add_warning(f"Cloud Detection: {warning_msg}")
+
+    return None
+
 def detect_cloud_from_ips(
     ip_ranges: Set[IPRange], 
     result: ReconnaissanceResult,
@@ -174,47 +261,8 @@ def detect_cloud_from_ips(
     
     for ipr in ip_ranges:
         processed_count += 1
-        ip_network_to_check = None
-        try:
-            # Create an IPNetwork object for the discovered range
-            ip_network_to_check = IPNetwork(ipr.cidr)
-        except (AddrFormatError, ValueError, TypeError) as e:
-            warning_msg = f"Skipping invalid discovered CIDR for cloud check: {ipr.cidr}. Error: {e}"
-            logger.warning(warning_msg)
-            result.add_warning(f"Cloud Detection: {warning_msg}")
-            continue
-        except Exception as e:
-             warning_msg = f"Unexpected error parsing IP range {ipr.cidr} for cloud check: {e}"
-             logger.exception(warning_msg) # Log traceback
-             result.add_warning(f"Cloud Detection: {warning_msg}")
-             continue
-
-        found_provider = None
-        try:
-            # Check for intersection against each provider's IPSet
-            for provider, cloud_set in _CLOUD_IP_SETS_BY_PROVIDER.items():
-                # Check if the discovered network intersects with the cloud provider's set
-                # Convert the single IPNetwork to an IPSet before intersection
-                if cloud_set.intersection(IPSet([ip_network_to_check])):
-                    found_provider = provider
-                    logger.debug(f"Found cloud match for {ipr.cidr} via netaddr IPSet: {provider}")
-                    # Add the result and break if we only want the first match
-                    result.add_cloud_service(CloudService(
-                        provider=found_provider,
-                        identifier=ipr.cidr,
-                        resource_type="IP Range",
-                        data_source="IPRangeMatch (netaddr)"
-                    ))
-                    found_count += 1
-                    break # Stop checking providers for this IP range once a match is found
-                    
-        except Exception as e:
-            # Catch errors during the intersection check itself
-            warning_msg = f"Error checking intersection for IP range {ipr.cidr} against cloud sets: {e}"
-            logger.exception(warning_msg)
-            result.add_warning(f"Cloud Detection: {warning_msg}")
-            # Continue to the next IP range
-            continue
+        if classify_ip_range(ipr, result):
+            found_count += 1
 
         # Update progress after checking each IP range
         if progress_callback:
@@ -226,6 +274,23 @@ def detect_cloud_from_ips(
     if progress_callback: progress_callback(100.0, "Finished IP range cloud check")
 
 # --- Domain-based Detection (Remains Largely Unchanged) ---
+def _iter_fqdns(domains: Set[Domain]) -> Iterator[Tuple[str, str]]:
+    """Yields (fqdn, resource_type) for each domain followed by its subdomains."""
+    for domain in domains:
+        yield domain.name, "Domain"
+        for subdomain in domain.subdomains:
+            yield subdomain.fqdn, "Subdomain"
+
+def _match_cloud_domain(fqdn: str) -> Optional[Tuple[str, str]]:
+    """Returns (provider, pattern) for the first cloud domain pattern matching the FQDN, or None."""
+    # Most names match no pattern: reject them with one combined scan instead of one per pattern
+    if not _ANY_CLOUD_DOMAIN_RE.search(fqdn):
+        return None
+    for provider, pattern, regex in _COMPILED_CLOUD_DOMAIN_PATTERNS:
+        if regex.search(fqdn):
+            return provider, pattern
+    return None
+
 def detect_cloud_from_domains(
     domains: Set[Domain], 
     result: ReconnaissanceResult,
@@ -238,53 +303,24 @@ def detect_cloud_from_domains(
     # Estimate total FQDNs for progress (base domains + subdomains)
     total_fqdns_to_check = len(domains) + sum(len(d.subdomains) for d in domains)
 
-    for domain in domains:
-        # Check the base domain itself
+    for fqdn, resource_type in _iter_fqdns(domains):
         processed_count += 1
-        match_found = False
-        for provider, patterns in CLOUD_DOMAIN_PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, domain.name, re.IGNORECASE):
-                    logger.debug(f"Found cloud domain match for {domain.name}: {provider} (Pattern: {pattern})")
-                    result.add_cloud_service(CloudService(
-                        provider=provider,
-                        identifier=domain.name,
-                        resource_type="Domain",
-                        data_source=f"DomainPatternMatch ({pattern})"
-                    ))
-                    found_count += 1
-                    match_found = True
-                    break # Stop checking patterns for this provider
-            if match_found: break # Stop checking providers for this domain
-            
-        # Update progress after checking base domain
+        match = _match_cloud_domain(fqdn)
+        if match:
+            provider, pattern = match
+            logger.debug(f"Found cloud domain match for {fqdn}: {provider} (Pattern: {pattern})")
+            result.add_cloud_service(CloudService(
+                provider=provider,
+                identifier=fqdn,
+                resource_type=resource_type,
+                data_source=f"DomainPatternMatch ({pattern})"
+            ))
+            found_count += 1
+
+        # Update progress after checking each FQDN
         if progress_callback:
              progress = (processed_count / total_fqdns_to_check) * 100 if total_fqdns_to_check > 0 else 0
              progress_callback(progress, f"Checked FQDN {processed_count}/{total_fqdns_to_check}")
-
-        # Check subdomains
-        for subdomain in domain.subdomains:
-            processed_count += 1
-            match_found = False
-            for provider, patterns in CLOUD_DOMAIN_PATTERNS.items():
-                for pattern in patterns:
-                     if re.search(pattern, subdomain.fqdn, re.IGNORECASE):
-                        logger.debug(f"Found cloud domain match for {subdomain.fqdn}: {provider} (Pattern: {pattern})")
-                        result.add_cloud_service(CloudService(
-                            provider=provider,
-                            identifier=subdomain.fqdn,
-                            resource_type="Subdomain",
-                            data_source=f"DomainPatternMatch ({pattern})"
-                        ))
-                        found_count += 1
-                        match_found = True
-                        break
-                if match_found: break
-                
-            # Update progress after checking subdomain
-            if progress_callback:
-                 progress = (processed_count / total_fqdns_to_check) * 100 if total_fqdns_to_check > 0 else 0
-                 progress_callback(progress, f"Checked FQDN {processed_count}/{total_fqdns_to_check}")
                 
     logger.info(f"Finished checking domain names for cloud patterns. Found {found_count} matches.")
     # Final progress update for this part
@@ -4,7 +4,8 @@ import logging
 import json
 import re
 import socket # For basic resolution fallback/checking
-from typing import Set, Optional, Tuple, Callable, Dict, Any, List
+import threading
+from typing import Set, Optional, Tuple, Callable, Dict
 from urllib.parse import quote_plus
 from concurrent.futures import ThreadPoolExecutor, as_completed # Import concurrent futures
 from datetime import datetime # Import datetime
@@ -30,26 +31,36 @@ logger = get_logger(__name__)
 CRTSH_URL = "https://crt.sh/"
 DEFAULT_MAX_DNS_WORKERS = 20 # Add max workers for DNS resolution
 
+# Precompiled patterns (applied to every name returned by crt.sh / passive DNS)
+_WILDCARD_PREFIX_RE = re.compile(r"^\*\.")
+_DOMAIN_NAME_RE = re.compile(r"^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+_VALID_FQDN_RE = re.compile(r"^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$", re.IGNORECASE)
+
 def _parse_crtsh_json(json_content: str, query: str, result: ReconnaissanceResult) -> Set[str]:
     """Parses the JSON output from crt.sh to extract domain names."""
     found_names = set()
     try:
         # crt.sh returns a list of JSON objects
         certificates = json.loads(json_content)
+        # The same names repeat across many certificates; collect the raw strings first
+        # so each unique name is stripped/lowercased only once
+        raw_common_names = set()
+        raw_san_names = set()
         for cert in certificates:
             # Extract Common Name (CN) and Subject Alternative Names (SANs)
             common_name = cert.get('common_name')
             if common_name:
-                found_names.add(common_name.strip().lower())
+                raw_common_names.add(common_name)
             
             name_value = cert.get('name_value')
             if name_value:
                 # name_value often contains multiple names separated by newlines
-                for name in name_value.split('\n'):
-                    if name:
-                         # Remove wildcard prefix if present (*.)
-                        clean_name = re.sub(r"^\*\.", "", name.strip().lower())
-                        found_names.add(clean_name)
+                raw_san_names.update(name_value.split('\n'))
+
+        found_names.update(name.strip().lower() for name in raw_common_names)
+        # Remove wildcard prefix if present (*.)
+        found_names.update(_WILDCARD_PREFIX_RE.sub("", name.strip().lower())
+                           for name in raw_san_names if name)
 
     except json.JSONDecodeError as e:
         warning_msg = f"Failed to decode crt.sh JSON response for query '{query}': {e}"
@@ -62,8 +73,7 @@ def _parse_crtsh_json(json_content: str, query: str, result: ReconnaissanceResul
     
     # Clean up results - remove entries that don't look like domains
     # and potentially filter based on the original query suffix?
-    valid_domain_regex = re.compile(r"^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
-    cleaned_names = {name for name in found_names if valid_domain_regex.match(name)}
+    cleaned_names = {name for name in found_names if _DOMAIN_NAME_RE.match(name)}
     
     logger.debug(f"Found {len(cleaned_names)} potential domains/subdomains from crt.sh for query '{query}'")
     return cleaned_names
@@ -114,9 +124,16 @@ def _query_crtsh(query: str, result: ReconnaissanceResult) -> Set[str]:
 
 # --- Helper function to manage HackerTarget API limit state ---
 # This dictionary will store the limit status per scan instance implicitly 
-# (cleared when find_domains finishes). A more robust approach might involve 
-# passing a state object, but this works for sequential calls within find_domains.
+# (the entry is removed once find_domains finishes its passive DNS queries, so the
+# dictionary does not grow with every scan run in a long-lived process).
 _hackertarget_limit_tracker: Dict[int, bool] = {}
+# Guards the tracker, as passive DNS queries of one scan run in parallel
+_hackertarget_limit_lock = threading.Lock()
+
+def _hackertarget_limit_hit(scan_instance_id: int) -> bool:
+    """Returns True if the HackerTarget API limit was hit in the given scan."""
+    with _hackertarget_limit_lock:
+        return _hackertarget_limit_tracker.get(scan_instance_id, False)
 
 @with_api_backoff
 def _check_and_query_hackertarget(domain: str, result: ReconnaissanceResult) -> Set[str]:
@@ -127,11 +144,15 @@ def _check_and_query_hackertarget(domain: str, result: ReconnaissanceResult) ->
     # Note: This assumes the result object persists throughout the find_domains call.
     scan_instance_id = id(result) 
 
-    if _hackertarget_limit_tracker.get(scan_instance_id, False):
+    if _hackertarget_limit_hit(scan_instance_id):
         logger.debug(f"Skipping HackerTarget query for {domain}: API limit previously hit in this scan.")
         return set()
 
     with rate_limiter.acquire("dnsdumpster", f"hackertarget_{domain}"):
+        # Check again: another worker may have hit the limit while this one waited for the rate limiter
+        if _hackertarget_limit_hit(scan_instance_id):
+            logger.debug(f"Skipping HackerTarget query for {domain}: API limit previously hit in this scan.")
+            return set()
         found_fqdns = set()
         url = f"https://api.hackertarget.com/hostsearch/?q={domain}"
         logger.info(f"Querying HackerTarget Passive DNS for: {domain}")
@@ -157,10 +178,12 @@ def _check_and_query_hackertarget(domain: str, result: ReconnaissanceResult) ->
                  if lines and "API count exceeded" in lines[0]:
                      warning_msg = f"HackerTarget API limit exceeded (detected during query for '{domain}'). Subsequent queries in this scan will be skipped."
                      # Log warning only the first time the limit is hit for this scan instance
-                     if not _hackertarget_limit_tracker.get(scan_instance_id, False):
+                     with _hackertarget_limit_lock:
+                         first_hit = not _hackertarget_limit_tracker.get(scan_instance_id, False)
+                         _hackertarget_limit_tracker[scan_instance_id] = True # Set limit hit flag for this scan
+                     if first_hit:
                          logger.warning(warning_msg)
                          result.add_warning(f"PassiveDNS (HackerTarget): API limit exceeded.") # Add generic warning once
-                         _hackertarget_limit_tracker[scan_instance_id] = True # Set limit hit flag for this scan
                      return set() # Stop processing for this domain
 
                  # Process lines if limit not hit
@@ -250,7 +273,8 @@ def find_domains(
     base_domains: Optional[Set[str]],
     result: ReconnaissanceResult,
     max_workers: int = DEFAULT_MAX_DNS_WORKERS,
-    progress_callback: Optional[Callable[[float, str], None]] = None
+    progress_callback: Optional[Callable[[float, str], None]] = None,
+    known_fqdns: Optional[Set[str]] = None
 ):
     """
     Finds domains and subdomains associated with an organization and adds them to the result.
@@ -261,7 +285,11 @@ def find_domains(
         result: ReconnaissanceResult to populate
         max_workers: Maximum number of concurrent workers for DNS resolution
         progress_callback: Optional callback for progress updates
+        known_fqdns: Optional set of domain/subdomain names already in the result from a previous
+            scan (not resolved again; their existing entries are kept)
     """
+    if known_fqdns is None:
+        known_fqdns = set()
     logger.info(f"🔍 Finding domains for: {org_name if org_name else 'Unknown'}")
     
     # Create a terminal progress logger
@@ -282,8 +310,7 @@ def find_domains(
         logger.info(f"Starting with {len(base_domains)} provided base domains")
     
     # Ensure valid base domains
-    valid_domain_regex = re.compile(r"^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
-    base_domains = {domain.lower() for domain in base_domains if valid_domain_regex.match(domain)}
+    base_domains = {domain.lower() for domain in base_domains if _DOMAIN_NAME_RE.match(domain)}
     
     # Add queries for base domains to crt.sh
     update_progress(10, "Searching certificate transparency logs...")
@@ -341,9 +368,8 @@ def find_domains(
     logger.info(f"Found {len(all_domains)} potential domains/subdomains via certificate transparency logs")
     
     # Filter out potential invalid entries before proceeding (e.g., IP addresses, single labels)
-    valid_domain_regex = re.compile(r"^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$", re.IGNORECASE)
     initial_count = len(all_domains)
-    all_domains = {name for name in all_domains if valid_domain_regex.match(name)}
+    all_domains = {name for name in all_domains if _VALID_FQDN_RE.match(name)}
     if initial_count != len(all_domains):
         logger.debug(f"Filtered {initial_count - len(all_domains)} invalid FQDN patterns found in CT logs.")
 
@@ -356,29 +382,52 @@ def find_domains(
     
     # Prepare a list of HackerTarget passive DNS queries to run
     # Only query base domains (domain.tld) for passive DNS
-    passive_dns_queries = set()
-    for domain_name in all_domains:
-        parts = domain_name.split('.')
-        if len(parts) == 2:
-            passive_dns_queries.add(domain_name)
-        # Add explicitly provided base domains if not already included
-        if base_domains:
-             passive_dns_queries.update(base_domains)
+    # A single dot means domain.tld; count() avoids building a parts list per name
+    passive_dns_queries = {domain_name for domain_name in all_domains if domain_name.count('.') == 1}
+    # Add explicitly provided base domains if not already included
+    if base_domains and all_domains:
+        passive_dns_queries.update(base_domains)
              
-    # Process each base domain for passive DNS (Sequentially)
+    # Process each base domain for passive DNS (in parallel, results merged here in the calling thread)
     update_progress(30, f"Performing passive DNS queries for {len(passive_dns_queries)} base domains...")
     
     all_subdomains = set()
     # Reset HackerTarget limit tracker at the start of the passive DNS phase for this scan
-    _hackertarget_limit_tracker[id(result)] = False 
-    for idx, query_domain in enumerate(passive_dns_queries):
-        # Query passive DNS using the helper function that manages the limit state
-        passive_dns_results = _check_and_query_hackertarget(query_domain, result)
-        all_subdomains.update(passive_dns_results)
-        
-        # Update progress proportionally (30-45%)
-        progress_percent = 30 + (idx / len(passive_dns_queries) * 15) if passive_dns_queries else 45
-        update_progress(progress_percent, f"Passive DNS query {idx+1}/{len(passive_dns_queries)}: found {len(passive_dns_results)} subdomains")
+    with _hackertarget_limit_lock:
+        _hackertarget_limit_tracker[id(result)] = False 
+    if passive_dns_queries:
+        passive_dns_count = 0
+        total_passive_dns_queries = len(passive_dns_queries)
+        # Keep concurrency low: the shared rate limiter throttles HackerTarget anyway
+        passive_dns_workers = min(max_workers, 3)
+        with ThreadPoolExecutor(max_workers=passive_dns_workers, thread_name_prefix="PassiveDNSQuery") as executor:
+            # Query passive DNS using the helper function that manages the limit state
+            future_to_domain = {executor.submit(_check_and_query_hackertarget, query_domain, result): query_domain
+                                for query_domain in passive_dns_queries}
+            for future in as_completed(future_to_domain):
+                query_domain = future_to_domain[future]
+                passive_dns_count += 1
+                passive_dns_results = set()
+                if future.cancelled():
+                    logger.debug(f"Skipped HackerTarget query for {query_domain}: API limit hit in this scan.")
+                else:
+                    try:
+                        passive_dns_results = future.result()
+                        all_subdomains.update(passive_dns_results)
+                    except Exception as exc:
+                        warning_msg = f"Passive DNS query for '{query_domain}' generated an exception: {exc}"
+                        logger.warning(warning_msg)
+                        result.add_warning(f"PassiveDNS (HackerTarget): {warning_msg}")
+                    if _hackertarget_limit_hit(id(result)):
+                        # Drop queued queries; running ones re-check the limit before their request
+                        for pending in future_to_domain:
+                            pending.cancel()
+                
+                # Update progress proportionally (30-45%)
+                progress_percent = 30 + (passive_dns_count / total_passive_dns_queries * 15)
+                update_progress(progress_percent, f"Passive DNS query {passive_dns_count}/{total_passive_dns_queries}: found {len(passive_dns_results)} subdomains")
+    with _hackertarget_limit_lock:
+        _hackertarget_limit_tracker.pop(id(result), None)
     
     # Add discovered subdomains to the all_domains set
     all_domains.update(all_subdomains)
@@ -386,15 +435,15 @@ def find_domains(
     # Group discovered domains
     grouped_domains = {}
     for domain_name in sorted(all_domains):
-        parts = domain_name.split('.')
-        if len(parts) >= 2:
-            base_domain = '.'.join(parts[-2:])  # e.g., "example.com"
-            if base_domain not in grouped_domains:
-                grouped_domains[base_domain] = set()
+        last_dot = domain_name.rfind('.')
+        if last_dot > 0:
+            # Slice from the second-to-last dot, e.g., "example.com" (rfind returns -1 for a 2-label name)
+            base_domain = domain_name[domain_name.rfind('.', 0, last_dot) + 1:]
+            subdomain_group = grouped_domains.setdefault(base_domain, set())
             
             if domain_name != base_domain:
                 # It's a subdomain, add to the appropriate group
-                grouped_domains[base_domain].add(domain_name)
+                subdomain_group.add(domain_name)
             # else it's a base domain, already recorded as the key
     
     # Start DNS resolution for validation
@@ -423,11 +472,16 @@ def find_domains(
     all_resolution_tasks = []
     for base_name, subdomains in grouped_domains.items():
         # Add base domain resolution task
-        all_resolution_tasks.append((base_name, base_domain_objects[base_name]))
+        if base_name not in known_fqdns:
+            all_resolution_tasks.append((base_name, base_domain_objects[base_name]))
         
         # Add all subdomain resolution tasks
         for subdomain_name in subdomains:
-            all_resolution_tasks.append((subdomain_name, base_domain_objects[base_name]))
+            if subdomain_name not in known_fqdns:
+                all_resolution_tasks.append((subdomain_name, base_domain_objects[base_name]))
+    if known_fqdns:
+        logger.info(f"Skipping DNS resolution for names already known from a previous scan "
+                    f"({len(all_resolution_tasks)} new names to resolve).")
     
     # Resolve DNS for all domains and subdomains
     update_progress(60, f"Resolving DNS for {len(all_resolution_tasks)} domains and subdomains...")
@@ -474,6 +528,12 @@ def find_domains(
                 logger.error(f"Error processing domain {domain_name}: {e}")
                 result.add_warning(f"Domain Processing Error: {domain_name} - {e}")
     
+    # Merge subdomains into domains already present in the result (e.g. carried over
+    # from a previous scan), as those are not the objects filled in above
+    for domain_obj in base_domain_objects.values():
+        if domain_obj in result.domains or domain_obj.name in known_fqdns:
+            result.add_domain(domain_obj)
+    
     # Final progress update
     total_subdomains = sum(len(domain.subdomains) for domain in result.domains)
     update_progress(100, f"Completed with {len(result.domains)} domains and {total_subdomains} subdomains")
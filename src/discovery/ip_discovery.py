@@ -1,5 +1,6 @@
 """Module for discovering IP ranges associated with ASNs or domains."""
 
+import functools
 import logging
 import re
 from typing import Set, Optional, Callable, List
@@ -9,10 +10,7 @@ from bs4 import BeautifulSoup
 import ipaddress # For validating CIDR
 from concurrent.futures import ThreadPoolExecutor, as_completed # Add imports
 
-# Import netaddr for summarization
-from netaddr import IPSet, cidr_merge 
-
-from src.core.models import ASN, IPRange, Domain, ReconnaissanceResult
+from src.core.models import ASN, IPRange, ReconnaissanceResult
 from src.utils.network import make_request
 from src.core.exceptions import DataSourceError
 from src.utils.rate_limiter import get_rate_limiter
@@ -23,14 +21,23 @@ logger = logging.getLogger(__name__)
 BGP_HE_NET_URL = "https://bgp.he.net"
 # Define IRR default server (can be overridden)
 DEFAULT_IRR_SERVER = "whois.radb.net"
+# Regex to find route or route6 lines (adjust as needed for different IRR formats)
+_IRR_ROUTE_RE = re.compile(r"^(route|route6):\s*([0-9a-fA-F:./]+)")
 
-def _is_valid_cidr(cidr_str: str) -> bool:
-    """Check if a string is a valid IPv4 or IPv6 CIDR."""
+@functools.lru_cache(maxsize=65536)
+def _parse_cidr(cidr_str: str) -> Optional[ipaddress._BaseNetwork]:
+    """Parse a CIDR string into a network object, or None if invalid.
+
+    Cached because the same prefixes are parsed during validation and again during summarization.
+    """
     try:
-        ipaddress.ip_network(cidr_str, strict=False)
-        return True
+        return ipaddress.ip_network(cidr_str, strict=False)
     except ValueError:
-        return False
+        return None
+
+def _is_valid_cidr(cidr_str: str) -> bool:
+    """Check if a string is a valid IPv4 or IPv6 CIDR."""
+    return _parse_cidr(cidr_str) is not None
 
 def _parse_bgp_he_net_asn_page(html_content: str, asn: ASN, result: ReconnaissanceResult) -> Set[IPRange]:
     """Parses the BGP.HE.NET ASN page for announced prefixes."""
@@ -129,31 +136,24 @@ def _fetch_and_parse_asn_page(asn: ASN, result: ReconnaissanceResult) -> Set[IPR
 def _parse_irr_output(output: str, asn: ASN, result: ReconnaissanceResult) -> Set[IPRange]:
     """Parses the text output from an IRR whois query for route/route6 objects."""
     discovered_ips: Set[IPRange] = set()
-    # Regex to find route or route6 lines (adjust as needed for different IRR formats)
-    route_regex = re.compile(r"^(route|route6):\s*([0-9a-fA-F:./]+)") 
-    
     current_country = None # Placeholder, IRR output format varies wildly
     
     lines = output.splitlines()
     for line in lines:
-        match = route_regex.match(line)
+        match = _IRR_ROUTE_RE.match(line)
         if match:
             cidr = match.group(2).strip()
-            if _is_valid_cidr(cidr):
-                try:
-                    network = ipaddress.ip_network(cidr, strict=False)
-                    version = network.version
-                    # Create IPRange object - Country parsing is complex and omitted here
-                    ipr = IPRange(
-                        cidr=cidr,
-                        version=version,
-                        asn=asn,
-                        country=None, # Country info often not reliable/present in route objects
-                        data_source=f"IRR({asn.number})"
-                    )
-                    discovered_ips.add(ipr)
-                except ValueError: # Should be caught by _is_valid_cidr, but for safety
-                    logger.warning(f"IRR Parser: Skipping invalid CIDR '{cidr}' found for AS{asn.number}")
+            network = _parse_cidr(cidr)
+            if network is not None:
+                # Create IPRange object - Country parsing is complex and omitted here
+                ipr = IPRange(
+                    cidr=cidr,
+                    version=network.version,
+                    asn=asn,
+                    country=None, # Country info often not reliable/present in route objects
+                    data_source=f"IRR({asn.number})"
+                )
+                discovered_ips.add(ipr)
             else:
                  logger.warning(f"IRR Parser: Regex matched invalid CIDR '{cidr}' for AS{asn.number}")
                  
@@ -209,8 +209,9 @@ def find_ip_ranges_for_asns(
     asns: Set[ASN], 
     result: ReconnaissanceResult, 
     max_workers: Optional[int] = None,
-    progress_callback: Optional[Callable[[float, str], None]] = None # Added callback
-    ):
+    progress_callback: Optional[Callable[[float, str], None]] = None, # Added callback
+    range_callback: Optional[Callable[[IPRange], None]] = None
+    ) -> bool:
     """Find IP ranges announced by a set of ASNs using BGP.HE.NET and IRR in parallel, 
        summarize them, and add to result.
     
@@ -219,6 +220,12 @@ def find_ip_ranges_for_asns(
         result: ReconnaissanceResult object to populate.
         max_workers: Maximum concurrent workers.
         progress_callback: Optional callback for progress updates.
+        range_callback: Optional callback invoked with each final IPRange as it is created,
+            so consumers (e.g. cloud detection) can process ranges in the same pass.
+    
+    Returns:
+        True if range_callback ran without error for every range added to the result,
+        False if it failed for some range or summarization failed part-way.
     """
     # Keep track of raw CIDRs found from all sources
     raw_cidrs_found: Set[str] = set()
@@ -226,7 +233,7 @@ def find_ip_ranges_for_asns(
     if not asns:
         logger.info("No ASNs provided, skipping IP range discovery.")
         if progress_callback: progress_callback(100.0, "Skipped (no ASNs)")
-        return # No ASNs to process
+        return True # No ASNs to process
     
     num_workers = max_workers if max_workers is not None else 10 
     logger.info(f"Starting parallel IP range discovery for {len(asns)} ASNs using up to {num_workers} workers.")
@@ -241,24 +248,13 @@ def find_ip_ranges_for_asns(
     completed_tasks = 0
     
     with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="ASN_IPRange") as executor:
-        # Submit BGP.HE.NET tasks
-        future_to_asn_bgp = {executor.submit(_fetch_and_parse_asn_page, asn, result): asn for asn in asns}
-        # Submit IRR tasks
-        future_to_asn_irr = {executor.submit(_query_irr_for_asn, asn, result): asn for asn in asns}
-        
-        # Combine futures for processing completion
-        all_futures = list(future_to_asn_bgp.keys()) + list(future_to_asn_irr.keys())
+        # Submit BGP.HE.NET and IRR tasks into a single future -> (asn, source) map
+        future_to_task = {executor.submit(_fetch_and_parse_asn_page, asn, result): (asn, "BGP.HE.NET") for asn in asns}
+        future_to_task.update({executor.submit(_query_irr_for_asn, asn, result): (asn, "IRR") for asn in asns})
         
-        for future in as_completed(all_futures):
+        for future in as_completed(future_to_task):
             completed_tasks += 1
-            asn = None
-            source = "Unknown"
-            if future in future_to_asn_bgp:
-                 asn = future_to_asn_bgp[future]
-                 source = "BGP.HE.NET"
-            elif future in future_to_asn_irr:
-                 asn = future_to_asn_irr[future]
-                 source = "IRR"
+            asn, source = future_to_task[future]
                  
             try:
                 ips_from_source = future.result()
@@ -281,32 +277,30 @@ def find_ip_ranges_for_asns(
     if not raw_cidrs_found:
         logger.warning("No raw CIDRs were found from any source. Cannot summarize.")
         if progress_callback: progress_callback(100.0, "Finished (no CIDRs found)")
-        return
+        return True
 
     logger.info(f"Found {len(raw_cidrs_found)} raw CIDRs. Summarizing...")
     if progress_callback: progress_callback(85.0, "Summarizing found IP ranges...")
 
     summarized_cidrs_result: List[ipaddress._BaseNetwork] = [] # Store final combined results here
     chunk_size = 10000  # Process in chunks of 10k
-    raw_cidr_list = list(raw_cidrs_found) # Convert set to list for slicing
 
     try:
         # Convert raw strings to ip_network objects and separate by version
         ipv4_objects: List[ipaddress.IPv4Network] = []
         ipv6_objects: List[ipaddress.IPv6Network] = []
         conversion_errors = 0
-        for cidr_str in raw_cidr_list:
-            try:
-                # Use strict=False to handle potential network/broadcast addresses if needed
-                network = ipaddress.ip_network(cidr_str, strict=False)
-                if network.version == 4:
-                    # Ensure correct type hint if needed later, though list handles it
-                    ipv4_objects.append(network)
-                elif network.version == 6:
-                    ipv6_objects.append(network)
-            except ValueError:
+        for cidr_str in raw_cidrs_found:
+            # Uses strict=False to handle potential network/broadcast addresses; cached from validation
+            network = _parse_cidr(cidr_str)
+            if network is None:
                 logger.warning(f"Summarization: Skipping invalid CIDR format '{cidr_str}' during conversion.")
                 conversion_errors += 1
+            elif network.version == 4:
+                # Ensure correct type hint if needed later, though list handles it
+                ipv4_objects.append(network)
+            elif network.version == 6:
+                ipv6_objects.append(network)
 
         total_converted = len(ipv4_objects) + len(ipv6_objects)
         logger.info(f"Successfully converted {total_converted} strings ({len(ipv4_objects)} IPv4, {len(ipv6_objects)} IPv6). Skipped {conversion_errors} invalid strings.")
@@ -414,6 +408,7 @@ def find_ip_ranges_for_asns(
 
         # --- Create IPRange objects for summarized results ---
         final_ip_ranges: Set[IPRange] = set()
+        all_ranges_processed = True
         # Use the combined summarized_cidrs_result list
         creation_count = 0
         total_to_create = len(summarized_cidrs_result)
@@ -432,13 +427,21 @@ def find_ip_ranges_for_asns(
             if len(asns) == 1:
                  origin_asn = next(iter(asns)) # Get the single ASN
 
-            final_ip_ranges.add(IPRange(
+            ip_range = IPRange(
                  cidr=cidr_str,
                  version=cidr_obj.version,
                  asn=origin_asn, # Simplified ASN assignment - often None after merge
                  country=None, # Country info lost during merge
                  data_source="Summarized (BGP.HE/IRR/ipaddress)" # Updated source
-            ))
+            )
+            final_ip_ranges.add(ip_range)
+            if range_callback:
+                try:
+                    range_callback(ip_range)
+                except Exception as e:
+                    # Keep the range; the caller re-checks all ranges when this returns False
+                    logger.warning(f"Range callback failed for {cidr_str}: {e}")
+                    all_ranges_processed = False
             creation_count += 1
             # Update progress during final object creation (95% to 100%)
             if progress_callback:
@@ -451,12 +454,14 @@ def find_ip_ranges_for_asns(
         logger.info(f"Added {len(final_ip_ranges)} summarized IP ranges to the result.")
         # Final progress update should be handled by the orchestrator, but ensure 100% here too
         if progress_callback: progress_callback(100.0, f"Finished IP Range Discovery ({len(final_ip_ranges)} ranges)")
+        return all_ranges_processed
 
     except Exception as e:
          # Catch any unexpected errors during the whole summarization process
          logger.exception(f"Error during IP range summarization phase: {e}")
          result.add_warning(f"IP Range Summarization Error: {e}")
          if progress_callback: progress_callback(100.0, "Error during summarization")
+         return False
 
 # --- IP Range Discovery from Domains (Placeholder/Not Used in Main Orchestration) ---
 # This might be useful if ASNs are unknown but domains are known
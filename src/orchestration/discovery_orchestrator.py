@@ -1,20 +1,56 @@
 """Orchestrates the discovery process using various modules."""
 
+import copy
+import functools
 import logging
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional, Set, Callable, Dict, Any
+from typing import Optional, Set, Callable
 
-from src.core.models import ReconnaissanceResult
-# Import discovery modules directly
-from src.discovery import asn_discovery, ip_discovery, domain_discovery, cloud_detection
+from src.core.models import ASN, ReconnaissanceResult
+# Discovery modules are imported inside each phase so that importing the orchestrator
+# (e.g. for DEFAULT_MAX_WORKERS) does not pull in bs4, dnspython, ipwhois, netaddr...
 from src.utils.logging_config import create_progress_logger, get_logger
+from src.utils.circuit_breaker import CircuitBreaker, get_circuit_breaker
 
 logger = get_logger(__name__)
 
 # Adjust max_workers based on typical usage and API limits
 DEFAULT_MAX_WORKERS = 10
 
+def _phase_circuit_open(
+    breaker: CircuitBreaker,
+    phase_name: str,
+    result: ReconnaissanceResult,
+    status_callback: Optional[Callable[[str, str], None]] = None
+) -> bool:
+    """Returns True (and records a warning) if the phase's circuit breaker is open."""
+    if breaker.allow_request():
+        return False
+    logger.warning("⚠️ Skipping %s: circuit open after repeated failures in previous scans", phase_name)
+    result.add_warning(f"{phase_name} skipped: circuit breaker open after repeated failures")
+    if status_callback:
+        status_callback("⚠️", f"Skipping {phase_name} (temporarily disabled after repeated failures)")
+    return True
+
+def _report_scaled_progress(
+    progress_callback: Callable[[float, str], None],
+    offset: float,
+    phase_progress: float,
+    message: str
+):
+    """Maps a phase's 0-100 progress onto its quarter of the overall 0-100 scale."""
+    progress_callback(offset + phase_progress / 4, message)
+
+def _phase_progress(
+    progress_callback: Optional[Callable[[float, str], None]],
+    offset: float
+) -> Optional[Callable[[float, str], None]]:
+    """Returns a progress callback scaled into [offset, offset + 25], or None if there is no callback."""
+    if progress_callback is None:
+        return None
+    return functools.partial(_report_scaled_progress, progress_callback, offset)
+
 # --- Phase 1: Domain Discovery ---
 def run_phase1_domains(
     target_organization: Optional[str], 
@@ -22,7 +58,8 @@ def run_phase1_domains(
     result: ReconnaissanceResult, 
     max_workers: int = DEFAULT_MAX_WORKERS,
     progress_callback: Optional[Callable[[float, str], None]] = None,
-    status_callback: Optional[Callable[[str, str], None]] = None
+    status_callback: Optional[Callable[[str, str], None]] = None,
+    known_fqdns: Optional[Set[str]] = None
 ):
     """
     Phase 1: Domain Discovery - Find domains and subdomains related to the target organization
@@ -34,8 +71,15 @@ def run_phase1_domains(
         max_workers: Maximum number of concurrent workers
         progress_callback: Optional callback for progress updates
         status_callback: Optional callback for status updates
+        known_fqdns: Optional set of domain/subdomain names already resolved in a previous scan
     """
-    logger.info(f"🌍 Phase 1: Discovering Domains & Subdomains for {target_organization}")
+    from src.discovery import domain_discovery
+
+    logger.info("🌍 Phase 1: Discovering Domains & Subdomains for %s", target_organization)
+    
+    breaker = get_circuit_breaker("phase1_domains")
+    if _phase_circuit_open(breaker, "Phase 1 (Domain Discovery)", result, status_callback):
+        return
     
     # Create a progress logger for terminal
     progress = create_progress_logger("domain_discovery", total=100, prefix="Domain Discovery")
@@ -54,16 +98,21 @@ def run_phase1_domains(
             progress_callback=lambda p, msg: (
                 progress.update(p, msg),  # Update terminal progress
                 progress_callback(p, msg) if progress_callback else None  # Update UI progress
-            )
+            ),
+            known_fqdns=known_fqdns
         )
         
         progress.update(100, "Domain discovery completed")
+        # get_all_subdomains() rebuilds a set on every call, so count once for both reports
+        subdomain_count = len(result.get_all_subdomains())
         if status_callback:
-            status_callback("✅", f"Domain discovery complete - Found {len(result.domains)} domains and {len(result.get_all_subdomains())} subdomains")
+            status_callback("✅", f"Domain discovery complete - Found {len(result.domains)} domains and {subdomain_count} subdomains")
         
-        logger.info(f"✅ Phase 1 completed: Found {len(result.domains)} domains and {len(result.get_all_subdomains())} subdomains")
+        logger.info("✅ Phase 1 completed: Found %d domains and %d subdomains", len(result.domains), subdomain_count)
+        breaker.record_success()
     except Exception as e:
-        logger.exception(f"❌ Error during Phase 1 (Domain Discovery): {e}")
+        breaker.record_failure()
+        logger.exception("❌ Error during Phase 1 (Domain Discovery): %s", e)
         result.add_warning(f"Phase 1 Error: {e}")
         if status_callback:
             status_callback("❌", f"Domain discovery error: {e}")
@@ -75,7 +124,8 @@ def run_phase2_asns(
     result: ReconnaissanceResult, 
     max_workers: int = DEFAULT_MAX_WORKERS,
     progress_callback: Optional[Callable[[float, str], None]] = None,
-    status_callback: Optional[Callable[[str, str], None]] = None
+    status_callback: Optional[Callable[[str, str], None]] = None,
+    known_ips: Optional[Set[str]] = None
 ):
     """
     Phase 2: ASN Discovery - Find autonomous systems related to the target organization
@@ -87,8 +137,15 @@ def run_phase2_asns(
         max_workers: Maximum number of concurrent workers
         progress_callback: Optional callback for progress updates
         status_callback: Optional callback for status updates
+        known_ips: Optional set of IPs already looked up in a previous scan
     """
-    logger.info(f"🌐 Phase 2: Discovering ASNs for {target_organization}")
+    from src.discovery import asn_discovery
+
+    logger.info("🌐 Phase 2: Discovering ASNs for %s", target_organization)
+    
+    breaker = get_circuit_breaker("phase2_asns")
+    if _phase_circuit_open(breaker, "Phase 2 (ASN Discovery)", result, status_callback):
+        return
     
     # Create a progress logger for terminal
     progress = create_progress_logger("asn_discovery", total=100, prefix="ASN Discovery")
@@ -107,16 +164,19 @@ def run_phase2_asns(
             progress_callback=lambda p, msg: (
                 progress.update(p, msg),  # Update terminal progress
                 progress_callback(p, msg) if progress_callback else None  # Update UI progress
-            )
+            ),
+            known_ips=known_ips
         )
         
         progress.update(100, "ASN discovery completed")
         if status_callback:
             status_callback("✅", f"ASN discovery complete - Found {len(result.asns)} ASNs")
             
-        logger.info(f"✅ Phase 2 completed: Found {len(result.asns)} ASNs")
+        logger.info("✅ Phase 2 completed: Found %d ASNs", len(result.asns))
+        breaker.record_success()
     except Exception as e:
-        logger.exception(f"❌ Error during Phase 2 (ASN Discovery): {e}")
+        breaker.record_failure()
+        logger.exception("❌ Error during Phase 2 (ASN Discovery): %s", e)
         result.add_warning(f"Phase 2 Error: {e}")
         if status_callback:
             status_callback("❌", f"ASN discovery error: {e}")
@@ -126,8 +186,10 @@ def run_phase3_ip_ranges(
     result: ReconnaissanceResult, 
     max_workers: int = DEFAULT_MAX_WORKERS,
     progress_callback: Optional[Callable[[float, str], None]] = None,
-    status_callback: Optional[Callable[[str, str], None]] = None
-):
+    status_callback: Optional[Callable[[str, str], None]] = None,
+    classify_cloud: bool = False,
+    asns: Optional[Set[ASN]] = None
+) -> bool:
     """
     Phase 3: IP Range Discovery - Find IP ranges for identified ASNs
     
@@ -136,52 +198,84 @@ def run_phase3_ip_ranges(
         max_workers: Maximum number of concurrent workers
         progress_callback: Optional callback for progress updates
         status_callback: Optional callback for status updates
+        classify_cloud: Whether to classify each IP range against known cloud
+            provider ranges as it is produced (fuses the Phase 4 IP check into this phase)
+        asns: Optional subset of ASNs to map (defaults to all ASNs in the result)
+        
+    Returns:
+        True if every IP range added in this phase was already classified for cloud providers
     """
-    logger.info(f"💻 Phase 3: Discovering IP Ranges for {len(result.asns)} ASNs")
+    from src.discovery import ip_discovery, cloud_detection
+
+    if asns is None:
+        asns = result.asns
+
+    logger.info("💻 Phase 3: Discovering IP Ranges for %d ASNs", len(asns))
     
     # Create a progress logger for terminal
     progress = create_progress_logger("ip_discovery", total=100, prefix="IP Range Discovery")
     progress.update(0, "Starting IP range discovery...")
     
-    if not result.asns:
-        logger.warning("⚠️ Phase 3 - Skipping IP Range discovery as no ASNs were found")
-        progress.update(100, "Skipped (no ASNs found)")
+    if not asns:
+        # With an explicit subset (incremental scan) the result may hold ASNs that were all mapped before
+        reason = "no new ASNs" if result.asns else "no ASNs found"
+        logger.warning("⚠️ Phase 3 - Skipping IP Range discovery (%s)", reason)
+        progress.update(100, f"Skipped ({reason})")
         if status_callback:
-            status_callback("⚠️", "Skipping IP Range discovery (no ASNs found)")
-        return
+            status_callback("⚠️", f"Skipping IP Range discovery ({reason})")
+        return False
         
+    breaker = get_circuit_breaker("phase3_ip_ranges")
+    if _phase_circuit_open(breaker, "Phase 3 (IP Range Discovery)", result, status_callback):
+        return False
+    
     if status_callback:
-        status_callback("🔍", f"Mapping IP ranges for {len(result.asns)} ASNs")
+        status_callback("🔍", f"Mapping IP ranges for {len(asns)} ASNs")
+    
+    range_callback = None
+    if classify_cloud and cloud_detection.cloud_ip_detection_ready():
+        # Classify each range inline instead of re-scanning result.ip_ranges in Phase 4
+        range_callback = functools.partial(cloud_detection.classify_ip_range, result=result)
     
     try:
         # ip_discovery modifies the result object directly
-        ip_discovery.find_ip_ranges_for_asns(
-            result.asns, 
+        ranges_classified = ip_discovery.find_ip_ranges_for_asns(
+            asns, 
             result, 
             max_workers,
             progress_callback=lambda p, msg: (
                 progress.update(p, msg),  # Update terminal progress
                 progress_callback(p, msg) if progress_callback else None  # Update UI progress
-            )
+            ),
+            range_callback=range_callback
         )
         
         progress.update(100, "IP range discovery completed")
         if status_callback:
             status_callback("✅", f"IP range discovery complete - Found {len(result.ip_ranges)} IP ranges")
             
-        logger.info(f"✅ Phase 3 completed: Found {len(result.ip_ranges)} IP ranges")
+        logger.info("✅ Phase 3 completed: Found %d IP ranges", len(result.ip_ranges))
+        breaker.record_success()
     except Exception as e:
-        logger.exception(f"❌ Error during Phase 3 (IP Range Discovery): {e}")
+        breaker.record_failure()
+        logger.exception("❌ Error during Phase 3 (IP Range Discovery): %s", e)
         result.add_warning(f"Phase 3 Error: {e}")
         if status_callback:
             status_callback("❌", f"IP range discovery error: {e}")
+        # Ranges added before the failure may not have been classified
+        return False
+    
+    if range_callback is not None and not ranges_classified:
+        logger.warning("Phase 3 - Some IP ranges were not classified inline; Phase 4 will check all IP ranges")
+    return range_callback is not None and ranges_classified
 
 # --- Phase 4: Cloud Detection ---
 def run_phase4_cloud(
     result: ReconnaissanceResult, 
     max_workers: int = DEFAULT_MAX_WORKERS,
     progress_callback: Optional[Callable[[float, str], None]] = None,
-    status_callback: Optional[Callable[[str, str], None]] = None
+    status_callback: Optional[Callable[[str, str], None]] = None,
+    skip_ip_ranges: bool = False
 ):
     """
     Phase 4: Cloud Detection - Identify cloud services used by the target
@@ -191,36 +285,45 @@ def run_phase4_cloud(
         max_workers: Maximum number of concurrent workers
         progress_callback: Optional callback for progress updates
         status_callback: Optional callback for status updates
+        skip_ip_ranges: Skip the IP range check (ranges were already classified in Phase 3)
     """
-    logger.info(f"☁️ Phase 4: Detecting Cloud Services")
+    from src.discovery import cloud_detection
+
+    logger.info("☁️ Phase 4: Detecting Cloud Services")
     
     # Create a progress logger for terminal
     progress = create_progress_logger("cloud_detection", total=100, prefix="Cloud Service Detection")
     progress.update(0, "Starting cloud service detection...")
     
+    # Set up the number of detection steps for progress reporting
+    check_ip_ranges = bool(result.ip_ranges) and not skip_ip_ranges
+    total_steps = 0
+    if check_ip_ranges: total_steps += 1
+    if result.domains: total_steps += 1
+    
+    # Checked before the breaker so that an empty run never takes (and strands) a half-open trial
+    if total_steps == 0:
+        logger.warning("⚠️ Phase 4 - Skipping Cloud detection as no domains or IP ranges were found")
+        progress.update(100, "Skipped (no resources to check)")
+        if status_callback:
+            status_callback("⚠️", "Skipping Cloud detection (no resources to check)")
+        return
+    
+    breaker = get_circuit_breaker("phase4_cloud")
+    if _phase_circuit_open(breaker, "Phase 4 (Cloud Detection)", result, status_callback):
+        return
+    
     if status_callback:
         status_callback("🔍", "Analyzing resources for cloud service usage")
     
     futures_cloud = []
     try:
-        # Set up the number of detection steps for progress reporting
-        total_steps = 0
-        if result.ip_ranges: total_steps += 1
-        if result.domains: total_steps += 1
-        
-        if total_steps == 0:
-            logger.warning("⚠️ Phase 4 - Skipping Cloud detection as no domains or IP ranges were found")
-            progress.update(100, "Skipped (no resources to check)")
-            if status_callback:
-                status_callback("⚠️", "Skipping Cloud detection (no resources to check)")
-            return
-            
         current_step = 0
         
         with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="DiscoveryPhase4_Cloud") as executor:
-            if result.ip_ranges:
+            if check_ip_ranges:
                 current_step += 1
-                logger.info(f"Checking {len(result.ip_ranges)} IP ranges for cloud footprint")
+                logger.info("Checking %d IP ranges for cloud footprint", len(result.ip_ranges))
                 progress.update(current_step * 30 / total_steps, f"Checking {len(result.ip_ranges)} IP ranges")
                 # Pass result object to be modified
                 futures_cloud.append(executor.submit(
@@ -230,12 +333,14 @@ def run_phase4_cloud(
                     # Only pass the terminal progress update, not the UI one
                     lambda p, msg: progress.update(30 + (p * 35 / 100), f"IP check: {msg}")
                 ))
+            elif skip_ip_ranges:
+                logger.debug("Phase 4 - Skipping Cloud IP detection (IP ranges classified during Phase 3).")
             else:
                 logger.debug("Phase 4 - Skipping Cloud IP detection (no IP ranges found).")
                  
             if result.domains:
                 current_step += 1
-                logger.info(f"Checking {len(result.domains)} domains for cloud footprint")
+                logger.info("Checking %d domains for cloud footprint", len(result.domains))
                 progress.update(65, f"Checking {len(result.domains)} domains")
                 # Pass result object to be modified
                 futures_cloud.append(executor.submit(
@@ -253,7 +358,7 @@ def run_phase4_cloud(
                 try:
                     future.result() # Wait for completion and raise exceptions if any occurred within the task
                 except Exception as e:
-                    logger.error(f"Error occurred within a cloud detection task: {e}")
+                    logger.error("Error occurred within a cloud detection task: %s", e)
                     result.add_warning(f"Cloud detection sub-task failed: {e}")
                     # Continue processing other futures
                      
@@ -261,9 +366,11 @@ def run_phase4_cloud(
         if status_callback:
             status_callback("✅", f"Cloud detection complete - Found {len(result.cloud_services)} cloud services")
             
-        logger.info(f"✅ Phase 4 completed: Found {len(result.cloud_services)} cloud services")
+        logger.info("✅ Phase 4 completed: Found %d cloud services", len(result.cloud_services))
+        breaker.record_success()
     except Exception as e:
-        logger.exception(f"❌ Error during Phase 4 (Cloud Detection): {e}")
+        breaker.record_failure()
+        logger.exception("❌ Error during Phase 4 (Cloud Detection): %s", e)
         result.add_warning(f"Phase 4 Error: {e}")
         if status_callback:
             status_callback("❌", f"Cloud detection error: {e}")
@@ -294,7 +401,73 @@ def run_discovery(
     """
     start_time = time.time()
     result = ReconnaissanceResult(target_organization=target_organization)
-    logger.info(f"🚀 Starting reconnaissance for: {target_organization}")
+    logger.info("🚀 Starting reconnaissance for: %s", target_organization)
+
+    _run_phases(result, base_domains, max_workers, progress_callback, status_callback)
+    _log_discovery_summary(result, start_time, progress_callback)
+    return result
+
+def run_incremental_discovery(
+    prior: ReconnaissanceResult,
+    base_domains: Optional[Set[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress_callback: Optional[Callable[[float, str], None]] = None,
+    status_callback: Optional[Callable[[str, str], None]] = None
+) -> ReconnaissanceResult:
+    """
+    Re-runs discovery on top of a previous result, only looking up assets that are new.
+    
+    The prior domains are used as base domains, names already resolved in the prior scan
+    are not resolved again, IPs already checked in the prior scan are skipped for
+    IP -> ASN lookup, and IP ranges are only fetched for newly found ASNs.
+    The prior result is not modified.
+    
+    Args:
+        prior: Result of a previous scan of the same organization (e.g. loaded from the database)
+        base_domains: Additional known domains to start with
+        max_workers: Maximum number of concurrent workers
+        progress_callback: Optional callback for progress updates
+        status_callback: Optional callback for status updates
+        
+    Returns:
+        ReconnaissanceResult containing the prior assets plus any newly discovered ones
+    """
+    start_time = time.time()
+    result = copy.deepcopy(prior)
+    result.warnings = [] # Warnings are per scan
+    logger.info("🚀 Starting incremental reconnaissance for: %s (%d known domains, %d known ASNs)",
+                result.target_organization, len(prior.domains), len(prior.asns))
+
+    known_domains = {domain.name for domain in prior.domains}
+    known_subdomains = prior.get_all_subdomains()
+    known_ips = {ip for subdomain in known_subdomains for ip in subdomain.resolved_ips or ()}
+    known_asns = set(prior.asns)
+
+    _run_phases(
+        result,
+        known_domains | set(base_domains or ()),
+        max_workers,
+        progress_callback,
+        status_callback,
+        known_fqdns=known_domains | {subdomain.fqdn for subdomain in known_subdomains},
+        known_asns=known_asns,
+        known_ips=known_ips
+    )
+    _log_discovery_summary(result, start_time, progress_callback)
+    return result
+
+def _run_phases(
+    result: ReconnaissanceResult,
+    base_domains: Optional[Set[str]],
+    max_workers: int,
+    progress_callback: Optional[Callable[[float, str], None]],
+    status_callback: Optional[Callable[[str, str], None]],
+    known_fqdns: Optional[Set[str]] = None,
+    known_asns: Optional[Set[ASN]] = None,
+    known_ips: Optional[Set[str]] = None
+):
+    """Runs the four discovery phases in order on the given result."""
+    target_organization = result.target_organization
 
     # Phase 1: Domain Discovery
     phase_start = time.time()
@@ -303,10 +476,11 @@ def run_discovery(
         base_domains, 
         result, 
         max_workers,
-        progress_callback=lambda p, msg: progress_callback(p / 4, msg) if progress_callback else None,
-        status_callback=status_callback
+        progress_callback=_phase_progress(progress_callback, 0),
+        status_callback=status_callback,
+        known_fqdns=known_fqdns
     )
-    logger.debug(f"Phase 1 completed in {time.time() - phase_start:.2f}s")
+    logger.debug("Phase 1 completed in %.2fs", time.time() - phase_start)
     
     # Phase 2: ASN Discovery
     phase_start = time.time()
@@ -315,47 +489,57 @@ def run_discovery(
         base_domains, 
         result, 
         max_workers,
-        progress_callback=lambda p, msg: progress_callback(25 + (p / 4), msg) if progress_callback else None,
-        status_callback=status_callback
+        progress_callback=_phase_progress(progress_callback, 25),
+        status_callback=status_callback,
+        known_ips=known_ips
     )
-    logger.debug(f"Phase 2 completed in {time.time() - phase_start:.2f}s")
+    logger.debug("Phase 2 completed in %.2fs", time.time() - phase_start)
     
-    # Phase 3: IP Range Discovery
+    # Phase 3: IP Range Discovery (IP ranges are classified for cloud providers as they are produced)
     phase_start = time.time()
-    run_phase3_ip_ranges(
+    new_asns = result.asns - known_asns if known_asns else None
+    ip_ranges_classified = run_phase3_ip_ranges(
         result, 
         max_workers,
-        progress_callback=lambda p, msg: progress_callback(50 + (p / 4), msg) if progress_callback else None,
-        status_callback=status_callback
+        progress_callback=_phase_progress(progress_callback, 50),
+        status_callback=status_callback,
+        classify_cloud=True,
+        asns=new_asns
     )
-    logger.debug(f"Phase 3 completed in {time.time() - phase_start:.2f}s")
+    if new_asns is not None and not new_asns:
+        # No new ranges: the prior ones were already classified by the previous scan
+        ip_ranges_classified = True
+    logger.debug("Phase 3 completed in %.2fs", time.time() - phase_start)
     
     # Phase 4: Cloud Detection
     phase_start = time.time()
     run_phase4_cloud(
         result, 
         max_workers,
-        progress_callback=lambda p, msg: progress_callback(75 + (p / 4), msg) if progress_callback else None,
-        status_callback=status_callback
+        progress_callback=_phase_progress(progress_callback, 75),
+        status_callback=status_callback,
+        skip_ip_ranges=ip_ranges_classified
     )
-    logger.debug(f"Phase 4 completed in {time.time() - phase_start:.2f}s")
+    logger.debug("Phase 4 completed in %.2fs", time.time() - phase_start)
 
-    # --- Finalization ---
-    end_time = time.time()
-    duration = end_time - start_time
-    logger.info(f"✨ Reconnaissance completed for {target_organization} in {duration:.2f} seconds")
-    logger.info(f"📊 Summary: Found {len(result.asns)} ASNs, {len(result.ip_ranges)} IP Ranges, " +
-                f"{len(result.domains)} Domains, {len(result.get_all_subdomains())} Subdomains, " +
-                f"{len(result.cloud_services)} Cloud Services")
+def _log_discovery_summary(
+    result: ReconnaissanceResult,
+    start_time: float,
+    progress_callback: Optional[Callable[[float, str], None]] = None
+):
+    """Logs the end-of-scan summary and reports final progress."""
+    duration = time.time() - start_time
+    logger.info("✨ Reconnaissance completed for %s in %.2f seconds", result.target_organization, duration)
+    logger.info("📊 Summary: Found %d ASNs, %d IP Ranges, %d Domains, %d Subdomains, %d Cloud Services",
+                len(result.asns), len(result.ip_ranges), len(result.domains),
+                len(result.get_all_subdomains()), len(result.cloud_services))
     
     # Update final UI progress if callback exists (now safe, in main thread)
     if progress_callback:
         progress_callback(100.0, f"Finished ({len(result.cloud_services)} cloud services found)")
         
     if result.warnings:
-        logger.warning(f"⚠️ Scan completed with {len(result.warnings)} warnings")
-    
-    return result
+        logger.warning("⚠️ Scan completed with %d warnings", len(result.warnings))
 
 # Example Usage (for testing individual phases or full run):
 if __name__ == '__main__':
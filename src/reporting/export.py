@@ -5,206 +5,277 @@ Author: jnjambrino
 import logging
 import csv
 import io
-from typing import Set, List, Dict, Any
+import ipaddress
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Callable, Iterable, Set, List, Dict, Optional, TextIO, Union
 
 from src.core.models import ReconnaissanceResult, ASN, IPRange, Domain, Subdomain, CloudService
 
 logger = logging.getLogger(__name__)
 
-def _get_csv_safe_string(value: Any) -> str:
-    """Convert value to string, handling None and ensuring basic safety for CSV."""
-    if value is None:
-        return ""
-    # Basic handling: coerce to string. More complex quoting/escaping might be needed
-    # depending on the csv writer settings and data complexity.
-    return str(value)
+# CSV headers per asset type, based on the model fields in the PRD
+ASN_CSV_HEADER = ('ASN Number', 'Name', 'Description', 'Country', 'Data Source')
+IP_RANGE_CSV_HEADER = ('CIDR', 'Version', 'Associated ASN', 'Country', 'Data Source')
+DOMAIN_CSV_HEADER = ('Domain Name', 'Registrar', 'Associated IPs', 'Subdomain Count', 'Data Source')
+SUBDOMAIN_CSV_HEADER = ('Subdomain FQDN', 'Status', 'Resolved IPs', 'Data Source')
+CLOUD_SERVICE_CSV_HEADER = ('Provider', 'Resource Type', 'Identifier', 'Data Source')
 
-def format_results_to_csv(result: ReconnaissanceResult) -> Dict[str, str]:
-    """Formats the reconnaissance results into multiple CSV strings, one per asset type.
+def _ip_range_sort_key(ipr: IPRange):
+    """Sort key ordering IP ranges by version, then network address, then prefix size.
+
+    Matches ipaddress network ordering, but as a tuple of ints so the O(N log N)
+    comparisons run in C instead of through the networks' Python-level __lt__.
+    """
+    network = ipaddress.ip_network(ipr.cidr)
+    return (ipr.version, int(network.network_address), int(network.netmask))
+
+def _sorted_ip_ranges(ip_ranges: Set[IPRange]) -> List[IPRange]:
+    """Sorts IP ranges for consistent output (shared by the CSV and text formatters)."""
+    return sorted(ip_ranges, key=_ip_range_sort_key)
+
+@dataclass
+class SortedViews:
+    """Sorted snapshots of a result's assets, shared by the CSV and text formatters.
+
+    Build one with prepare_views(result) and pass it as `views` to several formatters
+    to sort the result only once. It is a snapshot: it does not follow later changes
+    to the result.
+    """
+    asns: List[ASN]
+    ip_ranges: List[IPRange]
+    domains: List[Domain]
+    subdomains: List[Subdomain]
+    cloud_services: List[CloudService]
+    subdomain_ips: Dict[str, str]  # fqdn -> sorted, comma-joined resolved IPs
+    domain_subdomains: Dict[str, List[Subdomain]]  # domain name -> its subdomains, sorted by fqdn
+
+def _join_ips(ips: Optional[Set[str]]) -> str:
+    """Joins a set of IPs into a sorted, comma-separated string."""
+    return ", ".join(sorted(ips)) if ips else ""
+
+def prepare_views(result: ReconnaissanceResult) -> SortedViews:
+    """Sorts each asset collection of the result exactly once.
 
     Args:
         result: The ReconnaissanceResult object.
 
     Returns:
-        A dictionary where keys are asset types (e.g., 'asns', 'ip_ranges') 
-        and values are CSV data as strings.
+        SortedViews to pass to write_results_to_csv, format_results_to_csv
+        and format_results_to_text.
     """
-    csv_outputs: Dict[str, str] = {}
-    logger.info(f"Formatting results for {result.target_organization} into CSV...")
+    subdomains = sorted(result.get_all_subdomains(), key=attrgetter('fqdn'))
+    domains = sorted(result.domains, key=attrgetter('name'))
+    return SortedViews(
+        asns=sorted(result.asns, key=attrgetter('number')),
+        ip_ranges=_sorted_ip_ranges(result.ip_ranges),
+        domains=domains,
+        subdomains=subdomains,
+        cloud_services=sorted(result.cloud_services, key=attrgetter('provider', 'identifier')),
+        subdomain_ips={sub.fqdn: _join_ips(sub.resolved_ips) for sub in subdomains},
+        domain_subdomains={dom.name: sorted(dom.subdomains, key=attrgetter('fqdn')) for dom in domains}
+    )
+
+def _write_csv_section(stream: TextIO, header: Iterable[str], rows: Iterable[Iterable]) -> None:
+    """Writes one CSV section (header row, then data rows) to a stream."""
+    writer = csv.writer(stream, quoting=csv.QUOTE_MINIMAL)
+    writer.writerow(header)
+    writer.writerows(rows)
+
+def write_results_to_csv(
+    result: ReconnaissanceResult,
+    open_stream: Callable[[str], TextIO],
+    views: Optional[SortedViews] = None
+) -> List[str]:
+    """Writes the reconnaissance results as CSV, streaming each asset type to its own stream.
+
+    Rows are written as they are formatted, so e.g. file streams never hold a full
+    section in memory. Sections without data are skipped and their stream is never opened.
+
+    Args:
+        result: The ReconnaissanceResult object.
+        open_stream: Called with the asset type (e.g., 'asns', 'ip_ranges') and returns
+            the text stream to write that section to. The caller owns (and closes) the streams.
+        views: Optional sorted views from prepare_views(result), to share sorting with other formatters.
+
+    Returns:
+        The asset types that were written, in output order.
+    """
+    written: List[str] = []
+    logger.info(f"Writing results for {result.target_organization} as CSV...")
+    if views is None:
+        views = prepare_views(result)
 
     # --- ASNs --- 
     if result.asns:
         logger.debug(f"Formatting {len(result.asns)} ASNs to CSV.")
-        output = io.StringIO()
-        writer = csv.writer(output)
-        # Define header based on ASN model fields in PRD
-        header = ['ASN Number', 'Name', 'Description', 'Country', 'Data Source']
-        writer.writerow(header)
-        for asn in sorted(list(result.asns), key=lambda x: x.number):
-            writer.writerow([
-                _get_csv_safe_string(asn.number),
-                _get_csv_safe_string(asn.name),
-                _get_csv_safe_string(asn.description),
-                _get_csv_safe_string(asn.country),
-                _get_csv_safe_string(asn.data_source)
-            ])
-        csv_outputs['asns'] = output.getvalue()
-        output.close()
+        _write_csv_section(open_stream('asns'), ASN_CSV_HEADER, (
+            (
+                asn.number,
+                asn.name or '',
+                asn.description or '',
+                asn.country or '',
+                asn.data_source or ''
+            ) for asn in views.asns
+        ))
+        written.append('asns')
 
     # --- IP Ranges --- 
     if result.ip_ranges:
         logger.debug(f"Formatting {len(result.ip_ranges)} IP Ranges to CSV.")
-        output = io.StringIO()
-        writer = csv.writer(output)
-        # Define header based on IPRange model fields in PRD
-        header = ['CIDR', 'Version', 'Associated ASN', 'Country', 'Data Source']
-        writer.writerow(header)
-        # Sort for consistent output (optional, depends on desired order)
-        # Sorting by network address requires ipaddress library
-        try:
-             import ipaddress
-             sorted_ranges = sorted(list(result.ip_ranges), key=lambda x: (x.version, ipaddress.ip_network(x.cidr)))
-        except ImportError:
-             sorted_ranges = sorted(list(result.ip_ranges), key=lambda x: (x.version, x.cidr))
-
-        for ipr in sorted_ranges:
-            writer.writerow([
-                _get_csv_safe_string(ipr.cidr),
-                _get_csv_safe_string(ipr.version),
-                _get_csv_safe_string(f"AS{ipr.asn.number}" if ipr.asn else None),
-                _get_csv_safe_string(ipr.country), 
-                _get_csv_safe_string(ipr.data_source)
-            ])
-        csv_outputs['ip_ranges'] = output.getvalue()
-        output.close()
+        _write_csv_section(open_stream('ip_ranges'), IP_RANGE_CSV_HEADER, (
+            (
+                ipr.cidr,
+                ipr.version,
+                f"AS{ipr.asn.number}" if ipr.asn else '',
+                ipr.country or '',
+                ipr.data_source or ''
+            ) for ipr in views.ip_ranges
+        ))
+        written.append('ip_ranges')
 
     # --- Domains --- 
     if result.domains:
         logger.debug(f"Formatting {len(result.domains)} Domains to CSV.")
-        output = io.StringIO()
-        writer = csv.writer(output)
-        # Define header based on Domain model fields in PRD
-        header = ['Domain Name', 'Registrar', 'Associated IPs', 'Subdomain Count', 'Data Source']
-        writer.writerow(header)
-        for dom in sorted(list(result.domains), key=lambda x: x.name):
-            writer.writerow([
-                _get_csv_safe_string(dom.name),
-                _get_csv_safe_string(dom.registrar),
-                _get_csv_safe_string(", ".join(sorted(list(dom.resolved_ips)))), # Join IPs
-                _get_csv_safe_string(len(dom.subdomains)),
-                _get_csv_safe_string(dom.data_source)
-            ])
-        csv_outputs['domains'] = output.getvalue()
-        output.close()
+        _write_csv_section(open_stream('domains'), DOMAIN_CSV_HEADER, (
+            (
+                dom.name,
+                dom.registrar or '',
+                _join_ips(getattr(dom, 'resolved_ips', None)), # Join IPs
+                len(views.domain_subdomains[dom.name]),
+                dom.data_source or ''
+            ) for dom in views.domains
+        ))
+        written.append('domains')
 
     # --- Subdomains --- 
-    all_subdomains = result.get_all_subdomains()
-    if all_subdomains:
-        logger.debug(f"Formatting {len(all_subdomains)} Subdomains to CSV.")
-        output = io.StringIO()
-        writer = csv.writer(output)
-        # Define header based on Subdomain model fields in PRD
-        header = ['Subdomain FQDN', 'Status', 'Resolved IPs', 'Data Source']
-        writer.writerow(header)
-        for sub in sorted(list(all_subdomains), key=lambda x: x.fqdn):
-            writer.writerow([
-                _get_csv_safe_string(sub.fqdn),
-                _get_csv_safe_string(sub.status),
-                _get_csv_safe_string(", ".join(sorted(list(sub.resolved_ips)))),
-                _get_csv_safe_string(sub.data_source)
-            ])
-        csv_outputs['subdomains'] = output.getvalue()
-        output.close()
+    if views.subdomains:
+        logger.debug(f"Formatting {len(views.subdomains)} Subdomains to CSV.")
+        _write_csv_section(open_stream('subdomains'), SUBDOMAIN_CSV_HEADER, (
+            (
+                sub.fqdn,
+                sub.status or '',
+                views.subdomain_ips[sub.fqdn],
+                sub.data_source or ''
+            ) for sub in views.subdomains
+        ))
+        written.append('subdomains')
 
     # --- Cloud Services --- 
     if result.cloud_services:
         logger.debug(f"Formatting {len(result.cloud_services)} Cloud Services to CSV.")
-        output = io.StringIO()
-        writer = csv.writer(output)
-        header = ['Provider', 'Resource Type', 'Identifier', 'Data Source']
-        writer.writerow(header)
-        for svc in sorted(list(result.cloud_services), key=lambda x: (x.provider, x.identifier)):
-             writer.writerow([
-                 _get_csv_safe_string(svc.provider),
-                 _get_csv_safe_string(svc.resource_type),
-                 _get_csv_safe_string(svc.identifier),
-                 _get_csv_safe_string(svc.data_source)
-             ])
-        csv_outputs['cloud_services'] = output.getvalue()
-        output.close()
+        _write_csv_section(open_stream('cloud_services'), CLOUD_SERVICE_CSV_HEADER, (
+            (
+                svc.provider,
+                svc.resource_type or '',
+                svc.identifier,
+                svc.data_source or ''
+            ) for svc in views.cloud_services
+        ))
+        written.append('cloud_services')
+
+    logger.info("Finished writing results to CSV.")
+    return written
+
+def format_results_to_csv(
+    result: ReconnaissanceResult,
+    views: Optional[SortedViews] = None,
+    encoding: Optional[str] = None
+) -> Dict[str, Union[str, bytes]]:
+    """Formats the reconnaissance results into multiple CSV strings, one per asset type.
+
+    Args:
+        result: The ReconnaissanceResult object.
+        views: Optional sorted views from prepare_views(result), to share sorting with other formatters.
+        encoding: If set (e.g., 'utf-8'), each section is encoded once and returned as bytes,
+            ready to be written to disk or served for download.
+
+    Returns:
+        A dictionary where keys are asset types (e.g., 'asns', 'ip_ranges') 
+        and values are CSV data as strings (or bytes when `encoding` is given).
+    """
+    streams: Dict[str, io.StringIO] = {}
 
-    logger.info("Finished formatting results to CSV.")
+    def open_stream(asset_type: str) -> io.StringIO:
+        streams[asset_type] = io.StringIO()
+        return streams[asset_type]
+
+    write_results_to_csv(result, open_stream, views)
+    csv_outputs: Dict[str, Union[str, bytes]] = {}
+    for asset_type, output in streams.items():
+        content = output.getvalue()
+        csv_outputs[asset_type] = content.encode(encoding) if encoding else content
+    for output in streams.values():
+        output.close()
     return csv_outputs
 
-def format_results_to_text(result: ReconnaissanceResult) -> str:
+def _section_end(assets: Set) -> str:
+    """Closing text for a text-report section: a blank line, preceded by a placeholder if it is empty."""
+    return "\n" if assets else "- None discovered.\n\n"
+
+def format_results_to_text(result: ReconnaissanceResult, views: Optional[SortedViews] = None) -> str:
     """Formats the reconnaissance results into a simple plain text summary.
 
     Args:
         result: The ReconnaissanceResult object.
+        views: Optional sorted views from prepare_views(result), to share sorting with other formatters.
 
     Returns:
         A string containing the plain text report.
     """
     logger.info(f"Formatting results for {result.target_organization} into Plain Text...")
-    output = io.StringIO()
+    if views is None:
+        views = prepare_views(result)
+    parts: List[str] = []
 
-    output.write(f"# Reconnaissance Report for: {result.target_organization}\n\n")
+    parts.append(f"# Reconnaissance Report for: {result.target_organization}\n\n")
 
     # --- ASNs ---
-    output.write(f"## Autonomous Systems (ASNs) ({len(result.asns)} found)\n")
-    if result.asns:
-        for asn in sorted(list(result.asns), key=lambda x: x.number):
-            output.write(f"- AS{asn.number}: {asn.name or 'N/A'} ({asn.description or 'N/A'}) [Source: {asn.data_source or 'N/A'}]\n")
-    else:
-        output.write("- None discovered.\n")
-    output.write("\n")
+    parts.append(f"## Autonomous Systems (ASNs) ({len(result.asns)} found)\n")
+    parts.extend(
+        f"- AS{asn.number}: {asn.name or 'N/A'} ({asn.description or 'N/A'}) [Source: {asn.data_source or 'N/A'}]\n"
+        for asn in views.asns
+    )
+    parts.append(_section_end(result.asns))
 
     # --- IP Ranges ---
-    output.write(f"## IP Ranges ({len(result.ip_ranges)} found)\n")
-    if result.ip_ranges:
-        try:
-             import ipaddress
-             sorted_ranges = sorted(list(result.ip_ranges), key=lambda x: (x.version, ipaddress.ip_network(x.cidr)))
-        except ImportError:
-             sorted_ranges = sorted(list(result.ip_ranges), key=lambda x: (x.version, x.cidr))
-        for ipr in sorted_ranges:
-            asn_str = f" (AS{ipr.asn.number})" if ipr.asn else ""
-            output.write(f"- {ipr.cidr} (v{ipr.version}){asn_str} [Country: {ipr.country or 'N/A'}, Source: {ipr.data_source or 'N/A'}]\n")
-    else:
-        output.write("- None discovered.\n")
-    output.write("\n")
+    parts.append(f"## IP Ranges ({len(result.ip_ranges)} found)\n")
+    parts.extend(
+        f"- {ipr.cidr} (v{ipr.version}){f' (AS{ipr.asn.number})' if ipr.asn else ''}"
+        f" [Country: {ipr.country or 'N/A'}, Source: {ipr.data_source or 'N/A'}]\n"
+        for ipr in views.ip_ranges
+    )
+    parts.append(_section_end(result.ip_ranges))
 
     # --- Domains & Subdomains ---
-    output.write(f"## Domains ({len(result.domains)} found)\n")
-    if result.domains:
-        for dom in sorted(list(result.domains), key=lambda x: x.name):
-            output.write(f"### {dom.name} [Source: {dom.data_source or 'N/A'}]\n")
-            subdomains = sorted(list(dom.subdomains), key=lambda s: s.fqdn)
-            if subdomains:
-                 output.write("  Subdomains:\n")
-                 for sub in subdomains:
-                     status_str = f" (Status: {sub.status})" if sub.status else ""
-                     ips_str = f" -> [{ ', '.join(sorted(list(sub.resolved_ips))) }]" if sub.resolved_ips else ""
-                     output.write(f"  - {sub.fqdn}{status_str}{ips_str} [Source: {sub.data_source or 'N/A'}]\n")
-            else:
-                output.write("  - No subdomains discovered for this domain.\n")
-    else:
-         output.write("- None discovered.\n")
-    output.write("\n")
+    parts.append(f"## Domains ({len(result.domains)} found)\n")
+    for dom in views.domains:
+        parts.append(f"### {dom.name} [Source: {dom.data_source or 'N/A'}]\n")
+        subdomains = views.domain_subdomains[dom.name]
+        if subdomains:
+            parts.append("  Subdomains:\n")
+            for sub in subdomains:
+                joined_ips = views.subdomain_ips[sub.fqdn]
+                parts.append(
+                    f"  - {sub.fqdn}"
+                    f"{f' (Status: {sub.status})' if sub.status else ''}"
+                    f"{f' -> [{joined_ips}]' if joined_ips else ''}"
+                    f" [Source: {sub.data_source or 'N/A'}]\n"
+                )
+        else:
+            parts.append("  - No subdomains discovered for this domain.\n")
+    parts.append(_section_end(result.domains))
 
     # --- Cloud Services ---
-    output.write(f"## Cloud Services ({len(result.cloud_services)} found)\n")
-    if result.cloud_services:
-        for svc in sorted(list(result.cloud_services), key=lambda x: (x.provider, x.identifier)):
-             output.write(f"- {svc.provider}: {svc.identifier} ({svc.resource_type or 'N/A'}) [Source: {svc.data_source or 'N/A'}]\n")
-    else:
-         output.write("- None discovered.\n")
-    output.write("\n")
+    parts.append(f"## Cloud Services ({len(result.cloud_services)} found)\n")
+    parts.extend(
+        f"- {svc.provider}: {svc.identifier} ({svc.resource_type or 'N/A'}) [Source: {svc.data_source or 'N/A'}]\n"
+        for svc in views.cloud_services
+    )
+    parts.append(_section_end(result.cloud_services))
 
     logger.info("Finished formatting results to Plain Text.")
-    report_content = output.getvalue()
-    output.close()
-    return report_content
+    return "".join(parts)
 
 # Example Usage (for testing)
 if __name__ == '__main__':
@@ -23,6 +23,13 @@ from .backoff import (
     handle_http_429
 )
 
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitState,
+    get_circuit_breaker
+)
+
 __all__ = [
     # Rate limiting
     'RateLimiter',
@@ -41,5 +48,11 @@ __all__ = [
     'with_aggressive_backoff',
     'with_conservative_backoff',
     'create_rate_limit_aware_session',
-    'handle_http_429'
+    'handle_http_429',
+    
+    # Circuit breaking
+    'CircuitBreaker',
+    'CircuitBreakerConfig',
+    'CircuitState',
+    'get_circuit_breaker'
 ] 
\ No newline at end of file
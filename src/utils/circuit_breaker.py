@@ -0,0 +1,130 @@
+"""
+Circuit breaker for upstream data sources and discovery phases.
+
+This module provides a simple circuit breaker that trips after repeated consecutive
+failures and short-circuits further calls for a cooldown window, so that a scan does
+not keep burning time on an upstream that is known to be down.
+"""
+
+import time
+import logging
+import threading
+from enum import Enum
+from typing import Dict, Optional
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(Enum):
+    """Possible states of a circuit breaker."""
+    CLOSED = "closed"        # Calls flow normally
+    OPEN = "open"            # Calls are short-circuited until the reset timeout elapses
+    HALF_OPEN = "half_open"  # A single trial call is allowed through
+
+@dataclass
+class CircuitBreakerConfig:
+    """Configuration for circuit breaker behavior."""
+    failure_threshold: int = 5
+    reset_timeout: float = 300.0  # 5 minutes
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    Trips to OPEN after `failure_threshold` consecutive failures. Once `reset_timeout`
+    seconds have passed, one trial call is let through (HALF_OPEN); its outcome either
+    closes the circuit again or re-opens it for another cooldown window.
+    """
+
+    def __init__(self, name: str, config: Optional[CircuitBreakerConfig] = None):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            name: Name of the protected operation (used for logging)
+            config: Circuit breaker configuration (uses defaults if None)
+        """
+        self.name = name
+        self.config = config or CircuitBreakerConfig()
+        self.lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state of the circuit (OPEN becomes HALF_OPEN once the timeout elapsed)."""
+        with self.lock:
+            if (self._state == CircuitState.OPEN and
+                    time.monotonic() - self._opened_at >= self.config.reset_timeout):
+                return CircuitState.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        Returns:
+            True if the call may proceed, False if the circuit is open
+        """
+        with self.lock:
+            if self._state == CircuitState.CLOSED:
+                return True
+
+            if self._state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.config.reset_timeout:
+                    return False
+                # Cooldown elapsed: let a single trial call through
+                self._state = CircuitState.HALF_OPEN
+                logger.info(f"Circuit '{self.name}' half-open, allowing a trial call")
+                return True
+
+            # HALF_OPEN: a trial call is already in flight
+            return False
+
+    def record_success(self):
+        """Record a successful call, closing the circuit."""
+        with self.lock:
+            if self._state != CircuitState.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed after successful call")
+            self._state = CircuitState.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit if the threshold is reached."""
+        with self.lock:
+            self._consecutive_failures += 1
+            if (self._state == CircuitState.HALF_OPEN or
+                    self._consecutive_failures >= self.config.failure_threshold):
+                if self._state != CircuitState.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._consecutive_failures} "
+                                   f"consecutive failures (cooldown {self.config.reset_timeout:.0f}s)")
+                self._state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        """Force the circuit back to CLOSED."""
+        self.record_success()
+
+# Process-wide registry so breaker state survives across scans in the same process
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+def get_circuit_breaker(name: str, config: Optional[CircuitBreakerConfig] = None) -> CircuitBreaker:
+    """
+    Get the shared circuit breaker for a name, creating it on first use.
+
+    Args:
+        name: Name of the protected operation
+        config: Configuration used only when the breaker is created
+
+    Returns:
+        CircuitBreaker instance
+    """
+    with _registry_lock:
+        breaker = _circuit_breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, config)
+            _circuit_breakers[name] = breaker
+        return breaker
@@ -3,6 +3,8 @@ import sys
 import io
 import time
 import re
+import functools
+import traceback
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -134,6 +136,54 @@ class ProgressLogger:
 # Regular expression to match ANSI escape codes
 ANSI_ESCAPE_REGEX = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]')
 
+# Message highlighting rules as (compiled pattern, replacement), applied in order.
+# Compiled once here since they run on every formatted record.
+_HIGHLIGHT_RULES = (
+    # Highlight file paths (more robust: handles relative/absolute, common extensions)
+    # Ensure it doesn't capture parts of other highlighted items like domains with .html
+    # Apply path highlighting first to avoid conflicts
+    (re.compile(r'((?:\b[\w\.\-\/]+[\/\\])?[\w\.\-]+\.(?:html|py|json|txt|log|csv|db|sqlite|png|jpg|jpeg|gif))\b'),
+     f"{Colors.BRIGHT_CYAN}\\1{Colors.RESET}"),
+    # Highlight domains (avoid matching filenames like .html)
+    (re.compile(r'(\b(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+(?!html\b|py\b|json\b|txt\b|log\b|csv\b|db\b|sqlite\b|png\b|jpe?g\b|gif\b)[a-zA-Z]{2,}\b)'),
+     f"{Colors.BRIGHT_BLUE}\\1{Colors.RESET}"),
+    # Highlight IPs (IPv4)
+    (re.compile(r'(\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b)'),
+     f"{Colors.BRIGHT_MAGENTA}\\1{Colors.RESET}"),
+    # Highlight IPv6 Addresses (various forms)
+    # Basic regex, might need refinement for edge cases like embedded IPv4
+    (re.compile(r'(\b(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}\b|\b(?:[0-9a-fA-F]{1,4}:){1,7}:(?:[0-9a-fA-F]{1,4}:){0,6}\b|\b:(?::[0-9a-fA-F]{1,4}){1,7}\b|\b(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}\b)'),
+     f"{Colors.BRIGHT_MAGENTA}\\1{Colors.RESET}"),
+    # Highlight numbers and metrics
+    (re.compile(r'(\b\d+(?:\.\d+)?\s*(?:ms|s|m|KB|MB|GB|TB)?\b)'),
+     f"{Colors.BRIGHT_YELLOW}\\1{Colors.RESET}"),
+)
+
+_TRACEBACK_FILE_RE = re.compile(r'(File ".*", line \d+, in .*)')
+_TRACEBACK_FILE_REPLACEMENT = f"{Colors.DIM}\\1{Colors.RESET}"
+
+@functools.lru_cache(maxsize=256)
+def _resolve_component(logger_name: str):
+    """Returns (module_base, component_style) for a logger name.
+    
+    Cached since it is called for every log record but logger names are a small, fixed set.
+    """
+    module_parts = logger_name.split('.')
+    module_base = module_parts[-1] if module_parts else logger_name
+    component_style = LogStyle.COMPONENTS.get("utils") # Default style
+
+    # Try to identify component more specifically
+    # Check from longest path backwards to find the most specific component match
+    for i, part in enumerate(module_parts):
+        if part in LogStyle.COMPONENTS:
+             component_style = LogStyle.COMPONENTS[part]
+             # Keep searching for more specific matches further down the path if needed
+             # If the last part matches, it's likely the most specific one
+             if i == len(module_parts) - 1:
+                 module_base = part # Use the component name as base if it's the last part
+
+    return module_base, component_style
+
 # Custom formatter that dramatically improves log readability with colors and symbols
 class EnhancedFormatter(logging.Formatter):
     def __init__(self, fmt=None, datefmt=None, style='%'):
@@ -151,24 +201,7 @@ class EnhancedFormatter(logging.Formatter):
         style = self.styles.get(record.levelno, LogStyle.INFO)
         
         # Handle the module/component highlighting
-        module_parts = record.name.split('.')
-        module_base = module_parts[-1] if module_parts else record.name
-        component = "unknown"
-        component_style = LogStyle.COMPONENTS.get("utils") # Default style
-
-        # Try to identify component more specifically
-        # Check from longest path backwards to find the most specific component match
-        current_path = ""
-        for i, part in enumerate(module_parts):
-            current_path = f"{current_path}.{part}" if current_path else part
-            potential_component = part # Check the individual part
-            if potential_component in LogStyle.COMPONENTS:
-                 component = potential_component
-                 component_style = LogStyle.COMPONENTS[potential_component]
-                 # Keep searching for more specific matches further down the path if needed
-                 # If the last part matches, it's likely the most specific one
-                 if i == len(module_parts) - 1:
-                     module_base = part # Use the component name as base if it's the last part
+        module_base, component_style = _resolve_component(record.name)
 
         # Format timestamp
         timestamp = self.formatTime(record, self.datefmt)
@@ -196,40 +229,16 @@ class EnhancedFormatter(logging.Formatter):
             
         return log_line
     
-    def _highlight_patterns(self, message):
+    @staticmethod
+    def _highlight_patterns(message):
         """Highlight specific patterns in log messages"""
-        # Highlight file paths (more robust: handles relative/absolute, common extensions)
-        # Ensure it doesn't capture parts of other highlighted items like domains with .html
-        # Apply path highlighting first to avoid conflicts
-        path_pattern = r'((?:\b[\w\.\-\/]+[\/\\])?[\w\.\-]+\.(?:html|py|json|txt|log|csv|db|sqlite|png|jpg|jpeg|gif))\b'
-        message = re.sub(path_pattern,
-                         f"{Colors.BRIGHT_CYAN}\\1{Colors.RESET}", message)
-
-        # Highlight domains (avoid matching filenames like .html)
-        domain_pattern = r'(\b(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+(?!html\b|py\b|json\b|txt\b|log\b|csv\b|db\b|sqlite\b|png\b|jpe?g\b|gif\b)[a-zA-Z]{2,}\b)'
-        message = re.sub(domain_pattern,
-                         f"{Colors.BRIGHT_BLUE}\\1{Colors.RESET}", message)
-
-        # Highlight IPs (IPv4)
-        message = re.sub(r'(\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b)',
-                         f"{Colors.BRIGHT_MAGENTA}\\1{Colors.RESET}", message)
-
-        # Highlight IPv6 Addresses (various forms)
-        # Basic regex, might need refinement for edge cases like embedded IPv4
-        ipv6_pattern = r'(\b(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}\b|\b(?:[0-9a-fA-F]{1,4}:){1,7}:(?:[0-9a-fA-F]{1,4}:){0,6}\b|\b:(?::[0-9a-fA-F]{1,4}){1,7}\b|\b(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}\b)'
-        message = re.sub(ipv6_pattern,
-                         f"{Colors.BRIGHT_MAGENTA}\\1{Colors.RESET}", message)
-        
-        # Highlight numbers and metrics
-        message = re.sub(r'(\b\d+(?:\.\d+)?\s*(?:ms|s|m|KB|MB|GB|TB)?\b)', 
-                         f"{Colors.BRIGHT_YELLOW}\\1{Colors.RESET}", message)
-        
+        for pattern, replacement in _HIGHLIGHT_RULES:
+            message = pattern.sub(replacement, message)
         return message
     
-    def _format_traceback(self, record):
+    @staticmethod
+    def _format_traceback(record):
         """Format exception traceback with syntax highlighting"""
-        import traceback
-        
         # Get the traceback text
         tb_text = ''.join(traceback.format_exception(*record.exc_info))
         
@@ -242,8 +251,7 @@ class EnhancedFormatter(logging.Formatter):
         for line in tb_text.split('\n'):
             if line.strip().startswith("File "):
                 # Dim file and line info
-                colored_tb += re.sub(r'(File ".*", line \d+, in .*)',
-                                     f"{Colors.DIM}\\1{Colors.RESET}", line) + '\n'
+                colored_tb += _TRACEBACK_FILE_RE.sub(_TRACEBACK_FILE_REPLACEMENT, line) + '\n'
             elif line.strip().startswith('raise '):
                 # Highlight raise statements
                 colored_tb += f"{Colors.BRIGHT_RED}{line}{Colors.RESET}\n"
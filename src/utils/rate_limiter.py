@@ -28,7 +28,7 @@ class RateLimitConfig:
     max_retries: int = 3
     jitter_max_seconds: float = 1.0
 
-@dataclass
+@dataclass(slots=True)
 class RateLimitWindow:
     """Represents a time window for rate limiting."""
     window_start: float
@@ -39,7 +39,7 @@ class RateLimitWindow:
         if not isinstance(self.requests, deque):
             self.requests = deque(self.requests) if self.requests else deque()
 
-@dataclass
+@dataclass(slots=True)
 class RateLimitMetrics:
     """Metrics for rate limiting monitoring."""
     total_requests: int = 0
@@ -98,6 +98,12 @@ class RateLimiter:
                 requests_per_hour=1000,
                 burst_limit=5
             ),
+            "team_cymru": RateLimitConfig(
+                service="team_cymru",
+                requests_per_minute=10,
+                requests_per_hour=200,
+                burst_limit=2
+            ),
             "crt_sh": RateLimitConfig(
                 service="crt_sh",
                 requests_per_minute=60,
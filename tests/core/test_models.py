@@ -151,6 +151,45 @@ def test_recon_result_add_subdomain_existing_parent(empty_result):
     assert sub1 in parent.subdomains
     assert sub2 in parent.subdomains
 
+def test_recon_result_add_subdomain_after_domains_replaced(empty_result):
+    empty_result.add_domain(Domain(name="a.com"))
+    # Replace the domains set directly (as the DB loader does)
+    dom_b = Domain(name="b.com")
+    empty_result.domains = {dom_b}
+    sub1 = Subdomain(fqdn="www.b.com")
+    empty_result.add_subdomain("b.com", sub1)
+    empty_result.add_domain(Domain(name="a.com"))
+    assert len(empty_result.domains) == 2
+    assert sub1 in dom_b.subdomains
+
+def test_recon_result_add_subdomain_after_same_size_swap(empty_result):
+    dom_a = Domain(name="a.com")
+    empty_result.add_domain(dom_a)
+    empty_result.add_subdomain("a.com", Subdomain(fqdn="www.a.com")) # Index now holds a.com
+    # Swap a.com for b.com in place, so neither the set object nor its size changes
+    empty_result.domains.discard(dom_a)
+    dom_b = Domain(name="b.com")
+    empty_result.domains.add(dom_b)
+    sub_a = Subdomain(fqdn="mail.a.com")
+    sub_b = Subdomain(fqdn="www.b.com")
+    empty_result.add_subdomain("a.com", sub_a)
+    empty_result.add_subdomain("b.com", sub_b)
+    assert sub_b in dom_b.subdomains
+    assert sub_a not in dom_a.subdomains # Not attached to the removed domain
+    assert sub_a in empty_result.get_all_subdomains()
+    assert len(empty_result.domains) == 2
+
+def test_recon_result_add_warning_dedup_after_warnings_replaced(empty_result):
+    empty_result.add_warning("w1")
+    empty_result.add_warning("w1")
+    assert empty_result.warnings == ["w1"]
+    # Reset the list directly (as incremental discovery does)
+    empty_result.warnings = []
+    empty_result.add_warning("w1")
+    empty_result.add_warning("w2")
+    empty_result.add_warning("w2")
+    assert empty_result.warnings == ["w1", "w2"]
+
 def test_recon_result_add_cloud_service(empty_result):
     cs1 = CloudService(provider="A", identifier="1")
     cs2 = CloudService(provider="A", identifier="1") # Duplicate
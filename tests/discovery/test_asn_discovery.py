@@ -8,7 +8,7 @@ import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 from src.discovery import asn_discovery
-from src.core.models import ASN
+from src.core.models import ASN, ReconnaissanceResult
 from src.core.exceptions import DataSourceError
 
 # Sample HTML responses for mocking
@@ -70,6 +70,36 @@ def test_parse_bgp_he_net_search_invalid_html():
     result = asn_discovery._parse_bgp_he_net_search("<html><body><p>Invalid</p></body></html>")
     assert len(result) == 0
 
+# --- Tests for _parse_cymru_bulk_response --- 
+
+CYMRU_BULK_RESPONSE = """Bulk mode; whois.cymru.com [2024-05-01 10:00:00 +0000]
+AS      | IP               | BGP Prefix          | CC | Registry | Allocated  | AS Name
+15169   | 8.8.8.8          | 8.8.8.0/24          | US | arin     | 2023-12-28 | GOOGLE, US
+13335   | 1.1.1.1          | 1.1.1.0/24          | AU | apnic    | 2011-08-11 | CLOUDFLARENET, US
+NA      | 10.0.0.1         | NA                  |    | other    |            | NA
+"""
+
+def test_parse_cymru_bulk_response():
+    result = asn_discovery._parse_cymru_bulk_response(CYMRU_BULK_RESPONSE)
+    assert set(result) == {"8.8.8.8", "1.1.1.1"} # Banner, header and unrouted IP skipped
+    assert result["8.8.8.8"] == ASN(number=15169)
+    assert result["8.8.8.8"].name == "GOOGLE, US"
+    assert result["1.1.1.1"].country == "AU"
+    assert result["1.1.1.1"].data_source == "TeamCymru(1.1.1.1)"
+
+def test_bulk_lookup_cymru_batches_and_stops_after_failed_batch():
+    result = ReconnaissanceResult(target_organization="Example Org")
+    ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4", "10.0.0.5"]
+    batch_answer = lambda batch: {ip: ASN(number=100, data_source=f"TeamCymru({ip})") for ip in batch}
+    with patch.object(asn_discovery, 'CYMRU_BULK_BATCH_SIZE', 2), \
+         patch('src.discovery.asn_discovery._query_cymru_bulk') as mock_query:
+        mock_query.side_effect = [batch_answer(ips[:2]), TimeoutError("timed out"), batch_answer(ips[4:])]
+        asns_by_ip = asn_discovery._bulk_lookup_asns_cymru(set(ips), result)
+    # Batches of 2 in sorted order; the third batch is not sent after the second one failed
+    assert [call.args[0] for call in mock_query.call_args_list] == [ips[:2], ips[2:4]]
+    assert set(asns_by_ip) == set(ips[:2])
+    assert any("Team Cymru" in warning for warning in result.warnings)
+
 # --- Tests for _query_bgp_he_net --- 
 
 def test_query_bgp_he_net_success(mock_make_request):
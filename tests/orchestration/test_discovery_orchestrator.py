@@ -0,0 +1,185 @@
+"""Tests for the discovery orchestrator."""
+
+import pytest
+from types import ModuleType
+from unittest.mock import MagicMock
+
+# Add project root to allow imports
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import src.discovery
+from src.core.models import ASN, Domain, IPRange, ReconnaissanceResult, Subdomain
+from src.orchestration import discovery_orchestrator
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CircuitBreaker, CircuitBreakerConfig, CircuitState
+
+
+def _install_module(monkeypatch, name, **attrs):
+    """Replaces src.discovery.<name> (and its bs4/dns/netaddr imports) with a mock module."""
+    module = ModuleType(f"src.discovery.{name}")
+    for attr, value in attrs.items():
+        setattr(module, attr, value)
+    monkeypatch.setitem(sys.modules, f"src.discovery.{name}", module)
+    monkeypatch.setattr(src.discovery, name, module, raising=False)
+    return module
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    """Gives each test an empty circuit breaker registry."""
+    registry = {}
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", registry)
+    return registry
+
+
+@pytest.fixture
+def cloud_detection(monkeypatch):
+    return _install_module(
+        monkeypatch, "cloud_detection",
+        cloud_ip_detection_ready=MagicMock(return_value=False),
+        classify_ip_range=MagicMock(),
+        detect_cloud_from_ips=MagicMock(),
+        detect_cloud_from_domains=MagicMock()
+    )
+
+
+@pytest.fixture
+def sources(monkeypatch, breakers, cloud_detection):
+    """Mocks out every discovery source; each find_* mock does nothing unless given a side effect."""
+    return {
+        "domains": _install_module(monkeypatch, "domain_discovery", find_domains=MagicMock()).find_domains,
+        "asns": _install_module(monkeypatch, "asn_discovery", find_asns_for_organization=MagicMock()).find_asns_for_organization,
+        "ip_ranges": _install_module(monkeypatch, "ip_discovery", find_ip_ranges_for_asns=MagicMock()).find_ip_ranges_for_asns,
+        "cloud": cloud_detection,
+    }
+
+
+@pytest.fixture
+def prior():
+    """Result of a previous scan: one domain with one resolved subdomain, mapped to AS100."""
+    result = ReconnaissanceResult(target_organization="Example Corp")
+    result.add_domain(Domain(name="example.com"))
+    result.add_subdomain("example.com", Subdomain(fqdn="www.example.com", status="active", resolved_ips={"192.0.2.10"}))
+    result.add_asn(ASN(number=100))
+    result.add_ip_range(IPRange(cidr="192.0.2.0/24", version=4, asn=ASN(number=100)))
+    result.add_warning("old warning")
+    return result
+
+
+def _half_open_breaker(breakers, name):
+    """Registers a breaker whose cooldown has elapsed, so the next allowed call is the trial call."""
+    breaker = CircuitBreaker(name, CircuitBreakerConfig(failure_threshold=1, reset_timeout=0))
+    breaker.record_failure()
+    breakers[name] = breaker
+    return breaker
+
+
+def test_phase4_empty_input_does_not_strand_half_open_trial(breakers, cloud_detection):
+    breaker = _half_open_breaker(breakers, "phase4_cloud")
+
+    discovery_orchestrator.run_phase4_cloud(ReconnaissanceResult(target_organization="Example"))
+
+    cloud_detection.detect_cloud_from_domains.assert_not_called()
+    # Nothing was checked, so the trial call is still available to the next scan
+    assert breaker.allow_request()
+
+
+def test_phase4_trial_success_closes_circuit(breakers, cloud_detection):
+    breaker = _half_open_breaker(breakers, "phase4_cloud")
+    result = ReconnaissanceResult(target_organization="Example")
+    result.add_subdomain("example.com", Subdomain(fqdn="www.example.com"))
+
+    discovery_orchestrator.run_phase4_cloud(result)
+
+    cloud_detection.detect_cloud_from_domains.assert_called_once()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_phase3_classifies_ranges_inline(sources):
+    sources["cloud"].cloud_ip_detection_ready.return_value = True
+    sources["ip_ranges"].return_value = True
+    result = ReconnaissanceResult(target_organization="Example")
+    result.add_asn(ASN(number=100))
+
+    assert discovery_orchestrator.run_phase3_ip_ranges(result, classify_cloud=True)
+
+    ip_range = IPRange(cidr="192.0.2.0/24", version=4)
+    sources["ip_ranges"].call_args.kwargs["range_callback"](ip_range)
+    sources["cloud"].classify_ip_range.assert_called_once_with(ip_range, result=result)
+
+
+def test_phase3_reports_unclassified_ranges(sources):
+    # e.g. the summarization failed part-way, or classifying some range raised
+    sources["cloud"].cloud_ip_detection_ready.return_value = True
+    sources["ip_ranges"].return_value = False
+    result = ReconnaissanceResult(target_organization="Example")
+    result.add_asn(ASN(number=100))
+
+    assert not discovery_orchestrator.run_phase3_ip_ranges(result, classify_cloud=True)
+
+
+def test_incremental_skips_known_names_and_ips(sources, prior):
+    discovery_orchestrator.run_incremental_discovery(prior, base_domains={"example.org"})
+
+    domain_args = sources["domains"].call_args
+    assert domain_args.args[1] == {"example.com", "example.org"}
+    assert domain_args.kwargs["known_fqdns"] == {"example.com", "www.example.com"}
+    assert sources["asns"].call_args.kwargs["known_ips"] == {"192.0.2.10"}
+
+
+def test_incremental_phase3_only_maps_new_asns(sources, prior):
+    def find_asns(org_name, base_domains, result, max_workers, progress_callback=None, known_ips=None):
+        result.add_asn(ASN(number=100))
+        result.add_asn(ASN(number=200))
+    sources["asns"].side_effect = find_asns
+
+    discovery_orchestrator.run_incremental_discovery(prior)
+
+    assert sources["ip_ranges"].call_args.args[0] == {ASN(number=200)}
+
+
+def test_incremental_skips_phase3_without_new_asns(sources, prior):
+    statuses = []
+    discovery_orchestrator.run_incremental_discovery(prior, status_callback=lambda icon, msg: statuses.append(msg))
+
+    sources["ip_ranges"].assert_not_called()
+    assert "Skipping IP Range discovery (no new ASNs)" in statuses
+    # The prior ranges were classified by the previous scan; only the domains are checked again
+    sources["cloud"].detect_cloud_from_ips.assert_not_called()
+    sources["cloud"].detect_cloud_from_domains.assert_called_once()
+
+
+def test_incremental_handles_prior_subdomain_without_ips(sources, prior):
+    prior.add_subdomain("example.com", Subdomain(fqdn="old.example.com", resolved_ips=None))
+
+    discovery_orchestrator.run_incremental_discovery(prior)
+
+    assert sources["asns"].call_args.kwargs["known_ips"] == {"192.0.2.10"}
+
+
+def test_incremental_merges_into_copy_of_prior(sources, prior):
+    def find_domains(org_name, base_domains, result, max_workers, progress_callback=None, known_fqdns=None):
+        result.add_domain(Domain(name="example.com", subdomains={Subdomain(fqdn="api.example.com", status="active")}))
+        result.add_domain(Domain(name="example.net"))
+    def find_asns(org_name, base_domains, result, max_workers, progress_callback=None, known_ips=None):
+        result.add_asn(ASN(number=200))
+    def find_ip_ranges(asns, result, max_workers, progress_callback=None, range_callback=None):
+        result.add_ip_range(IPRange(cidr="198.51.100.0/24", version=4, asn=ASN(number=200)))
+    sources["domains"].side_effect = find_domains
+    sources["asns"].side_effect = find_asns
+    sources["ip_ranges"].side_effect = find_ip_ranges
+
+    result = discovery_orchestrator.run_incremental_discovery(prior)
+
+    assert {d.name for d in result.domains} == {"example.com", "example.net"}
+    assert {s.fqdn for s in result.get_all_subdomains()} == {"www.example.com", "api.example.com"}
+    assert result.asns == {ASN(number=100), ASN(number=200)}
+    assert {r.cidr for r in result.ip_ranges} == {"192.0.2.0/24", "198.51.100.0/24"}
+    assert "old warning" not in result.warnings
+
+    # The prior result is left untouched
+    assert {s.fqdn for s in prior.get_all_subdomains()} == {"www.example.com"}
+    assert prior.asns == {ASN(number=100)}
+    assert len(prior.ip_ranges) == 1
+    assert prior.warnings == ["old warning"]
@@ -27,7 +27,7 @@ def sample_result():
     dom1 = Domain(name="company.com", registrar="Reg Inc.", data_source="SourceE")
     dom1.subdomains.add(Subdomain(fqdn="www.company.com", status="Active", resolved_ips={"10.0.0.1", "10.0.0.2"}, data_source="SourceF"))
     dom1.subdomains.add(Subdomain(fqdn="mail.company.com", status="Inactive", data_source="SourceG"))
-    dom1.resolved_ips = {"10.0.0.1"}
+    object.__setattr__(dom1, "resolved_ips", {"10.0.0.1"}) # Domain is frozen and has no resolved_ips field
     result.add_domain(dom1)
     result.add_domain(Domain(name="other.net", data_source="SourceH")) # Domain with no subs
     
@@ -126,4 +126,43 @@ def test_format_text_empty_results():
     text_report = export.format_results_to_text(empty)
     assert "# Reconnaissance Report for: Empty" in text_report
     assert "(0 found)" in text_report
-    assert "- None discovered." in text_report 
\ No newline at end of file
+    assert "- None discovered." in text_report 
+
+
+# --- Tests for shared sorted views ---
+
+def test_prepared_views_shared_between_formatters():
+    result = ReconnaissanceResult(target_organization="Views Corp")
+    result.add_asn(ASN(number=200))
+    result.add_asn(ASN(number=100))
+    result.add_ip_range(IPRange(cidr="10.0.1.0/24", version=4))
+    result.add_ip_range(IPRange(cidr="10.0.0.0/24", version=4))
+    result.add_cloud_service(CloudService(provider="AWS", identifier="b"))
+    views = export.prepare_views(result)
+    assert [asn.number for asn in views.asns] == [100, 200]
+    assert [ipr.cidr for ipr in views.ip_ranges] == ["10.0.0.0/24", "10.0.1.0/24"]
+    assert export.format_results_to_csv(result, views) == export.format_results_to_csv(result)
+    assert export.format_results_to_text(result, views) == export.format_results_to_text(result)
+
+
+def test_write_results_to_csv_streams_sections():
+    result = ReconnaissanceResult(target_organization="Stream Corp")
+    result.add_asn(ASN(number=100, name="ASN-100"))
+    result.add_cloud_service(CloudService(provider="AWS", identifier="b"))
+    streams = {}
+
+    def open_stream(asset_type):
+        streams[asset_type] = io.StringIO()
+        return streams[asset_type]
+
+    written = export.write_results_to_csv(result, open_stream)
+    assert written == ['asns', 'cloud_services']
+    assert {key: stream.getvalue() for key, stream in streams.items()} == export.format_results_to_csv(result)
+
+
+def test_format_csv_encoding_returns_bytes():
+    result = ReconnaissanceResult(target_organization="Bytes Corp")
+    result.add_asn(ASN(number=100, name="Zürich Net"))
+    text_outputs = export.format_results_to_csv(result)
+    byte_outputs = export.format_results_to_csv(result, encoding='utf-8')
+    assert byte_outputs == {'asns': text_outputs['asns'].encode('utf-8')}
@@ -0,0 +1,63 @@
+"""Tests for the circuit breaker utility."""
+
+# Add project root to allow imports
+import sys, os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CircuitBreaker, CircuitBreakerConfig, CircuitState, get_circuit_breaker
+
+
+def test_circuit_opens_after_threshold():
+    breaker = CircuitBreaker("test", CircuitBreakerConfig(failure_threshold=3, reset_timeout=60))
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", CircuitBreakerConfig(failure_threshold=2, reset_timeout=60))
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_half_open_trial_call(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    breaker = CircuitBreaker("test", CircuitBreakerConfig(failure_threshold=1, reset_timeout=60))
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    now[0] += 59
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+    now[0] += 1
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request() # Trial call
+    assert not breaker.allow_request() # Only one trial call at a time
+
+    # Failed trial re-opens the circuit for a full cooldown window
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    now[0] += 60
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_registry_returns_shared_instance():
+    breaker = get_circuit_breaker("test_registry")
+    assert get_circuit_breaker("test_registry") is breaker
+    assert get_circuit_breaker("test_registry_other") is not breaker